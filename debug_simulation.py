@@ -0,0 +1,59 @@
+"""
+Step-by-step UCB scoring introspection for two routes.
+
+Trains a small LearnableEdge on VIP/guest traffic and prints, for each
+decision, the per-arm expected reward, exploration bonus and UCB score the
+policy is choosing from.
+"""
+
+import numpy as np
+
+from adaptivegraph import LearnableEdge
+
+
+def ucb_breakdown(router: LearnableEdge, ctx: np.ndarray):
+    """
+    Compute (expected, uncertainty, ucb) for every arm in one batched solve.
+
+    Solving A_a [theta_a, A_a^-1 x] = [b_a, x] for all arms at once replaces
+    2 * n_actions separate LAPACK calls with a single stacked one.
+    """
+    A_stack = router.policy.A  # (n_actions, d, d)
+    b_stack = router.policy.b  # (n_actions, d)
+    ctx_b = np.broadcast_to(ctx, b_stack.shape)
+
+    sol = np.linalg.solve(A_stack, np.stack([b_stack, ctx_b], axis=-1))
+    theta, A_inv_x = sol[..., 0], sol[..., 1]
+
+    expected = np.einsum("ad,ad->a", theta, ctx_b)
+    uncertainty = router.policy.alpha * np.sqrt(np.einsum("ad,ad->a", ctx_b, A_inv_x))
+    return expected, uncertainty, expected + uncertainty
+
+
+def debug_run(steps: int = 20):
+    router = LearnableEdge(
+        options=["slow_accurate", "fast_cheap"],
+        feature_dim=16,
+        exploration_alpha=0.5,
+    )
+    state_vip = "User vip request"
+    state_guest = "User guest request"
+
+    for i in range(steps):
+        is_vip = i % 2 == 0
+        state = state_vip if is_vip else state_guest
+        ctx = router.encoder.encode(state)
+
+        expected, uncertainty, ucb = ucb_breakdown(router, ctx)
+        route = router(state)
+
+        print(f"Step {i:02d} [{'vip' if is_vip else 'guest'}] -> {route}")
+        for name, e, u, p in zip(router.options, expected, uncertainty, ucb):
+            print(f"    {name:<14} exp={e:+.3f} bonus={u:.3f} ucb={p:+.3f}")
+
+        optimal = "slow_accurate" if is_vip else "fast_cheap"
+        router.record_feedback(result={}, reward=1.0 if route == optimal else 0.0)
+
+
+if __name__ == "__main__":
+    debug_run()
@@ -1,12 +1,19 @@
 __version__ = "0.1.2"
 
+import importlib
+from typing import Any
+
 from .core import LearnableEdge
 
-__all__ = ["LearnableEdge"]
-from .encoder import StateEncoder
-from .memory import InMemoryExperienceStore
-from .policy import LinUCBPolicy
-from .rewards import ErrorScorer, LLMScorer
+# Everything else is imported on first attribute access (PEP 562), so
+# `from adaptivegraph import LearnableEdge` only loads what the edge needs.
+_LAZY_IMPORTS = {
+    "StateEncoder": ".encoder",
+    "InMemoryExperienceStore": ".memory",
+    "LinUCBPolicy": ".policy",
+    "ErrorScorer": ".rewards",
+    "LLMScorer": ".rewards",
+}
 
 __all__ = [
     "LearnableEdge",
@@ -16,3 +23,16 @@ __all__ = [
     "ErrorScorer",
     "LLMScorer",
 ]
+
+
+def __getattr__(name: str) -> Any:
+    if name in _LAZY_IMPORTS:
+        module = importlib.import_module(_LAZY_IMPORTS[name], __name__)
+        value = getattr(module, name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_IMPORTS))
@@ -1,5 +1,9 @@
+import contextvars
+import itertools
 import logging
-from typing import Any, Callable, Dict, List, Optional
+import threading
+import warnings
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import numpy as np
 
@@ -9,6 +13,59 @@ from .policy import LinUCBPolicy
 
 logger = logging.getLogger(__name__)
 
+# State keys that opt a decision into ID-based or trajectory feedback
+_EVENT_ID_KEYS = ("event_id", "id", "run_id")
+
+# Last sequential decision per edge, scoped to the current thread / asyncio
+# task. One module-level variable holds an {edge key: (context, action)} map
+# that is replaced, never mutated, so copied contexts stay independent.
+_LAST_DECISIONS: contextvars.ContextVar[Dict[int, Tuple[np.ndarray, int]]] = (
+    contextvars.ContextVar("adaptivegraph_last_decisions", default={})
+)
+
+# Edge keys for _LAST_DECISIONS; unlike id(), never reused by a later edge
+_edge_keys = itertools.count()
+
+
+class TraceBuffer:
+    """
+    Decisions of one trace, stored as a growable (contexts, actions) pair.
+
+    Contexts live in one contiguous (capacity, dim) array instead of a list
+    of per-step tuples, so completing a trace is a handful of matrix ops.
+    """
+
+    def __init__(self, dim: int, dtype: Any = np.float32, capacity: int = 8):
+        self._contexts = np.empty((capacity, dim), dtype=dtype)
+        self._actions = np.empty(capacity, dtype=np.int64)
+        self._n = 0
+
+    def append(self, context: np.ndarray, action: int) -> None:
+        if self._n == len(self._actions):
+            # Grow geometrically so appends stay amortized O(dim)
+            capacity = 2 * len(self._actions)
+            contexts = np.empty(
+                (capacity, self._contexts.shape[1]), self._contexts.dtype
+            )
+            contexts[: self._n] = self._contexts[: self._n]
+            actions = np.empty(capacity, dtype=np.int64)
+            actions[: self._n] = self._actions[: self._n]
+            self._contexts, self._actions = contexts, actions
+        self._contexts[self._n] = context
+        self._actions[self._n] = action
+        self._n += 1
+
+    @property
+    def contexts(self) -> np.ndarray:
+        return self._contexts[: self._n]
+
+    @property
+    def actions(self) -> np.ndarray:
+        return self._actions[: self._n]
+
+    def __len__(self) -> int:
+        return self._n
+
 
 class LearnableEdge:
     @classmethod
@@ -19,6 +76,7 @@ class LearnableEdge:
         memory: str = "faiss",
         memory_persist_path: Optional[str] = None,
         feature_dim: int = 32,
+        embedding_path: Optional[str] = None,
         **kwargs,
     ) -> "LearnableEdge":
         """
@@ -26,10 +84,13 @@ class LearnableEdge:
 
         Args:
             options: List of available actions.
-            embedding: Encoding strategy ("sentence-transformers", etc).
+            embedding: Encoding strategy ("sentence-transformers",
+                "sentence-transformers-onnx", "static", "hashing").
             memory: Experience storage strategy ("faiss", "memory").
             memory_persist_path: Path prefix for saving memory (if memory="faiss").
             feature_dim: Dimension of state vector.
+            embedding_path: Word-vector file (GloVe/fastText text format), required
+                for embedding="static".
             **kwargs: Additional args passed to LearnableEdge constructor.
         """
         # 1. Setup Embedding
@@ -46,6 +107,26 @@ class LearnableEdge:
                     "Install with: pip install adaptivegraph[embed] or pip install sentence-transformers\n"
                     "Alternatively, set embedding=None to use basic hashing instead of semantic embeddings."
                 ) from e
+        elif embedding == "sentence-transformers-onnx":
+            try:
+                from .embedding import OnnxSentenceEmbedding
+
+                embedding_fn = OnnxSentenceEmbedding(dim=feature_dim)
+            except ImportError as e:
+                raise ImportError(
+                    "The 'optimum[onnxruntime]' package is required for ONNX embedding. "
+                    "Install with: pip install adaptivegraph[onnx] "
+                    "or pip install 'optimum[onnxruntime]'"
+                ) from e
+        elif embedding == "static":
+            if embedding_path is None:
+                raise ValueError(
+                    "embedding='static' requires embedding_path pointing to a "
+                    "GloVe/fastText word-vector file."
+                )
+            from .embedding import StaticEmbedding
+
+            embedding_fn = StaticEmbedding(embedding_path, dim=feature_dim)
         elif embedding is None or embedding == "hashing":
             # Use default hashing behavior (no embedding_fn needed for StateEncoder)
             embedding_fn = None
@@ -54,7 +135,8 @@ class LearnableEdge:
             if embedding != "sentence-transformers":
                 raise ValueError(
                     f"Unknown embedding option: '{embedding}'. "
-                    "Supported: ['sentence-transformers', 'hashing', None]. "
+                    "Supported: ['sentence-transformers', 'sentence-transformers-onnx', "
+                    "'static', 'hashing', None]. "
                     "For custom embeddings, use the LearnableEdge constructor directly."
                 )
 
@@ -73,7 +155,7 @@ class LearnableEdge:
                     "Install with: pip install adaptivegraph[faiss] or pip install faiss-cpu"
                 ) from e
         elif memory == "memory":
-            experience_store = InMemoryExperienceStore()
+            experience_store = InMemoryExperienceStore(dim=feature_dim)
         else:
             raise ValueError(
                 f"Unknown memory option: '{memory}'. Valid: ['faiss', 'memory']"
@@ -98,6 +180,13 @@ class LearnableEdge:
         experience_store: Optional[ExperienceStore] = None,
         exploration_alpha: float = 1.0,
         value_key: Optional[str] = None,
+        dtype: Any = np.float32,
+        encoder_cache_size: int = 4096,
+        track_ids: bool = True,
+        hash_algorithm: str = "shake256",
+        max_pending: int = 4096,
+        id_key: Optional[str] = None,
+        seed: Optional[int] = None,
     ):
         # Input validation
         if not options or len(options) == 0:
@@ -106,13 +195,22 @@ class LearnableEdge:
             raise ValueError("options must contain unique values")
         if feature_dim <= 0:
             raise ValueError(f"feature_dim must be positive, got {feature_dim}")
+        if max_pending <= 0:
+            raise ValueError(f"max_pending must be positive, got {max_pending}")
         if exploration_alpha < 0:
             raise ValueError(
                 f"exploration_alpha must be non-negative, got {exploration_alpha}"
             )
 
-        self.options = options
+        # Immutable so the index -> name mapping can't drift from the policy
+        self.options: Tuple[str, ...] = tuple(options)
         self.reward_fn = reward_fn
+        self.track_ids = track_ids
+
+        # Keys read for event-id feedback, in priority order; id_key narrows
+        # it to one lookup. Any tracked key (incl. trace_id) enables tracking.
+        self._event_id_keys = (id_key,) if id_key else _EVENT_ID_KEYS
+        self._tracked_keys = frozenset(self._event_id_keys + ("trace_id",))
         self.value_key = value_key
 
         # Components
@@ -120,75 +218,247 @@ class LearnableEdge:
             output_dim=feature_dim,
             embedding_fn=embedding_fn,
             normalize=encoder_normalize,
+            dtype=dtype,
+            cache_size=encoder_cache_size,
+            hash_algorithm=hash_algorithm,
         )
 
         # Memory
         self.memory = (
             experience_store
             if experience_store is not None
-            else InMemoryExperienceStore()
+            else InMemoryExperienceStore(dim=feature_dim, dtype=dtype)
         )
 
         if policy == "linucb":
             self.policy = LinUCBPolicy(
-                n_actions=len(options), feature_dim=feature_dim, alpha=exploration_alpha
+                n_actions=len(options),
+                feature_dim=feature_dim,
+                alpha=exploration_alpha,
+                dtype=dtype,
+                seed=seed,
             )
         else:
             raise ValueError(f"Unknown policy: {policy}. Valid options: ['linucb']")
 
         # State tracking for feedback
-        # Supports both sequential (last_context) and async (ID-based) feedback.
-        self._last_context: Optional[np.ndarray] = None
-        self._last_action: int = -1
+        # Supports both sequential (last decision) and async (ID-based) feedback.
+        # The last decision lives in _LAST_DECISIONS so concurrent threads /
+        # asyncio tasks each pair their own __call__ with their own
+        # record_feedback.
+        self._edge_key = next(_edge_keys)
+
+        # Guards the shared ID/trace maps and policy/memory updates
+        self._lock = threading.Lock()
+
+        # Per-thread scoring buffers reused by every __call__ on that thread
+        self._scratch = threading.local()
 
-        # Map event_id -> (context, action_idx)
-        self.pending_decisions: Dict[str, Any] = {}
+        # Decisions awaiting ID-based feedback live in a fixed ring of
+        # preallocated slots. Rewarded slots go back on a free-list; the
+        # oldest open decision is evicted only once max_pending are open.
+        self.max_pending = max_pending
+        self._ctx_ring = np.empty((max_pending, feature_dim), dtype=dtype)
+        self._action_ring = np.empty(max_pending, dtype=np.int64)
+        self._free_slots = list(range(max_pending - 1, -1, -1))
 
-        # Map trace_id -> List[(context, action_idx)]
-        self.active_traces: Dict[str, List[Any]] = {}
+        # Map event_id -> ring slot, in the order decisions were opened
+        self.pending_decisions: Dict[str, int] = {}
+
+        # Map trace_id -> TraceBuffer of (context, action_idx) steps
+        self.active_traces: Dict[str, TraceBuffer] = {}
 
     def __call__(self, state: Any) -> str:
         """
         The main routing entry point.
         """
         # 1. Extract Value (if key provided)
-        value_to_encode = state
-        if self.value_key:
-            if isinstance(state, dict):
-                value_to_encode = state.get(self.value_key, state)
-            elif hasattr(state, self.value_key):
-                value_to_encode = getattr(state, self.value_key)
+        value_to_encode = self._extract(state)
 
-        # 2. Encode
-        context = self.encoder.encode(value_to_encode)
-
-        # 2. Select Action
-        action_idx = self.policy.select_action(context)
+        # 2. Encode + Select Action
+        context, action_idx = self._fused_route(value_to_encode)
         action_name = self.options[action_idx]
-        logger.debug(f"Selected action '{action_name}' (index {action_idx}) for state")
+        # Guarded so the message is only formatted when debug logging is on
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                f"Selected action '{action_name}' (index {action_idx}) for state"
+            )
 
         # 3. Store temporary state for feedback
-        self._last_context = context
-        self._last_action = action_idx
+        decisions = _LAST_DECISIONS.get()
+        _LAST_DECISIONS.set({**decisions, self._edge_key: (context, action_idx)})
 
         # 3b. ID-Based Tracking (if ID present in state)
-        if isinstance(state, dict):
-            # Check for generic event_id
-            event_id = state.get("event_id") or state.get("id") or state.get("run_id")
-            if event_id:
-                self.pending_decisions[str(event_id)] = (context, action_idx)
-
-            # Check for trace_id (Trajectory tracking)
-            trace_id = state.get("trace_id")
-            if trace_id:
-                t_id = str(trace_id)
-                if t_id not in self.active_traces:
-                    self.active_traces[t_id] = []
-                self.active_traces[t_id].append((context, action_idx))
+        self._track_decision(state, context, action_idx)
 
         # 4. Return routing decision
         return action_name
 
+    def cache_clear(self) -> None:
+        """Clear the encoder's cache of string embeddings."""
+        self.encoder.cache_clear()
+
+    def reset(self) -> None:
+        """
+        Forget everything learned: policy, experience memory, pending
+        decisions and active traces.
+
+        Buffers are reused rather than reallocated. Memory is emptied with
+        `memory.clear()` when the store has one; custom stores without it
+        keep their experiences.
+
+        Warning:
+            This is destructive for a persistent store: a
+            `FaissExperienceStore` with a `persist_path` deletes its
+            `.index`, `.pkl` and `.log` files.
+        """
+        with self._lock:
+            self.policy.reset()
+            clear = getattr(self.memory, "clear", None)
+            if clear is not None:
+                clear()
+            self.pending_decisions.clear()
+            self._free_slots = list(range(self.max_pending - 1, -1, -1))
+            self.active_traces.clear()
+        self._pop_last_decision()
+
+    def _fused_route(self, value: Any) -> Tuple[np.ndarray, int]:
+        """
+        Encode `value` and pick an arm without intermediate arrays.
+
+        The context is written straight into the vector that is kept for
+        feedback, and arms are scored in this thread's reusable buffers.
+        """
+        scratch = self._scratch
+        if not hasattr(scratch, "scores"):
+            dtype = self.policy.dtype
+            scratch.scores = np.empty((2, self.policy.n_actions), dtype=dtype)
+            scratch.work = np.empty(
+                (self.policy.n_actions, self.policy.feature_dim), dtype=dtype
+            )
+
+        context = np.empty(self.encoder.output_dim, dtype=self.encoder.dtype)
+        self.encoder._encode_into(value, context)
+        action_idx = self.policy._select_into(context, scratch.scores, scratch.work)
+        return context, action_idx
+
+    def batch_call(self, states: List[Any]) -> List[str]:
+        """
+        Route many states at once.
+
+        Encodes all states in one batch (a single forward pass when the
+        embedding supports it) and scores every state against every arm with
+        stacked matrix products.
+
+        Args:
+            states: List of states, each accepted by `__call__`.
+
+        Returns:
+            Selected action name for each state, in order.
+
+        Note:
+            Batched decisions are not available to sequential `record_feedback`;
+            include `event_id` or `trace_id` in the states to reward them.
+        """
+        if not states:
+            return []
+
+        values = [self._extract(state) for state in states]
+        contexts = self.encoder.encode_batch(values)
+        action_idxs = self.policy.select_action_batch(contexts)
+
+        for state, context, action_idx in zip(states, contexts, action_idxs):
+            self._track_decision(state, context, int(action_idx))
+
+        return [self.options[i] for i in action_idxs]
+
+    @property
+    def value_key(self) -> Optional[str]:
+        return self._value_key
+
+    @value_key.setter
+    def value_key(self, key: Optional[str]) -> None:
+        # Resolve the key-vs-passthrough decision once instead of per call
+        self._value_key = key
+        self._extract = self._make_extractor(key)
+
+    def _make_extractor(self, key: Optional[str]) -> Callable[[Any], Any]:
+        id_keys = self._tracked_keys
+
+        def strip_ids(state: Any) -> Any:
+            # IDs are bookkeeping, not features: leaving them out means equal
+            # payloads encode identically and hit the encoder caches
+            if isinstance(state, dict) and not state.keys().isdisjoint(id_keys):
+                return {k: v for k, v in state.items() if k not in id_keys}
+            return state
+
+        if not key:
+            return strip_ids
+
+        def extract(state: Any) -> Any:
+            if isinstance(state, dict):
+                return strip_ids(state.get(key, state))
+            return getattr(state, key, state)
+
+        return extract
+
+    def _track_decision(self, state: Any, context: np.ndarray, action_idx: int) -> None:
+        # One C-level set check skips the per-key lookups for untagged states
+        if (
+            not self.track_ids
+            or not isinstance(state, dict)
+            or state.keys().isdisjoint(self._tracked_keys)
+        ):
+            return
+
+        # Check for generic event_id (first truthy key wins)
+        for key in self._event_id_keys:
+            event_id = state.get(key)
+            if event_id:
+                break
+        if event_id:
+            with self._lock:
+                self._store_pending(str(event_id), context, action_idx)
+
+        # Check for trace_id (Trajectory tracking)
+        trace_id = state.get("trace_id")
+        if trace_id:
+            with self._lock:
+                trace = self.active_traces.get(str(trace_id))
+                if trace is None:
+                    trace = self.active_traces[str(trace_id)] = TraceBuffer(
+                        context.shape[0], context.dtype
+                    )
+                trace.append(context, action_idx)
+
+    def _store_pending(
+        self, event_id: str, context: np.ndarray, action_idx: int
+    ) -> None:
+        # Caller holds self._lock
+        slot = self.pending_decisions.get(event_id)
+        if slot is None:
+            if self._free_slots:
+                slot = self._free_slots.pop()
+            else:
+                # Every slot is open: reuse the oldest decision's slot
+                evicted = next(iter(self.pending_decisions))
+                slot = self.pending_decisions.pop(evicted)
+                logger.debug(
+                    f"Evicted pending decision '{evicted}' (max_pending reached)"
+                )
+            self.pending_decisions[event_id] = slot
+        self._ctx_ring[slot] = context
+        self._action_ring[slot] = action_idx
+
+    def _pop_last_decision(self) -> Tuple[Optional[np.ndarray], int]:
+        decisions = _LAST_DECISIONS.get()
+        if self._edge_key not in decisions:
+            return None, -1
+        decisions = dict(decisions)
+        decision = decisions.pop(self._edge_key)
+        _LAST_DECISIONS.set(decisions)
+        return decision
+
     def record_feedback(
         self,
         result: Any,
@@ -203,24 +473,40 @@ class LearnableEdge:
             result: The result state (used if reward_fn is set).
             reward: Explicit reward float.
             event_id: The ID of the event to provide feedback for (async mode).
+
+        Note:
+            Without `event_id`, only a decision made by `__call__` in the same
+            thread / asyncio task is rewarded; called from anywhere else this
+            warns and does nothing. Pass `event_id` when feedback arrives
+            elsewhere.
         """
         target_context = None
         target_action = -1
 
         if event_id:
             # Async Mode
-            if event_id in self.pending_decisions:
-                target_context, target_action = self.pending_decisions.pop(event_id)
-            else:
-                # Warning: ID not found or already processed
-                return
+            with self._lock:
+                slot = self.pending_decisions.pop(event_id, None)
+                if slot is None:
+                    # Warning: ID not found, already processed or evicted
+                    return
+                # Copy out: the slot may be reused once the lock is released
+                target_context = self._ctx_ring[slot].copy()
+                target_action = int(self._action_ring[slot])
+                self._free_slots.append(slot)
         else:
             # Sequential Mode
-            target_context = self._last_context
-            target_action = self._last_action
             # Clear pending immediately
-            self._last_context = None
-            self._last_action = -1
+            target_context, target_action = self._pop_last_decision()
+            if target_context is None:
+                warnings.warn(
+                    "record_feedback() found no pending decision in this thread / "
+                    "asyncio task; the feedback is ignored. If __call__ ran in "
+                    "another context (e.g. inside a LangGraph run), pass event_id.",
+                    UserWarning,
+                    stacklevel=2,
+                )
+                return
 
         if target_context is None or target_action == -1:
             return  # No pending action to reward
@@ -236,12 +522,16 @@ class LearnableEdge:
         if not np.isfinite(reward):
             raise ValueError(f"Reward must be finite, got {reward}")
 
-        # Update Policy
-        self.policy.update(target_context, target_action, reward)
-        logger.info(f"Recorded feedback: action={target_action}, reward={reward:.3f}")
+        with self._lock:
+            # Update Policy
+            self.policy.update(target_context, target_action, reward)
 
-        # Store Experience
-        self.memory.add(target_context, target_action, reward)
+            # Store Experience
+            self.memory.add(target_context, target_action, reward)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                f"Recorded feedback: action={target_action}, reward={reward:.3f}"
+            )
 
     def complete_trace(
         self, trace_id: str, final_reward: float, decay: float = 1.0
@@ -263,39 +553,50 @@ class LearnableEdge:
         if not np.isfinite(final_reward):
             raise ValueError(f"final_reward must be finite, got {final_reward}")
 
-        decisions = self.active_traces.pop(t_id)
-        current_reward = final_reward
-
-        # Iterate in reverse order if applying decay (last step gets full reward, earlier steps get discounted)
-        # Or standard credit assignment
-        for ctx, act in reversed(decisions):
-            self.policy.update(ctx, act, current_reward)
-            self.memory.add(ctx, act, current_reward)
-            current_reward *= decay
+        with self._lock:
+            trace = self.active_traces.pop(t_id, None)
+            if trace is None:
+                return
+            contexts, actions = trace.contexts, trace.actions
+
+            # Last step gets the full reward, earlier steps are discounted
+            # (decay=1.0 is standard equal credit assignment)
+            rewards = final_reward * decay ** np.arange(len(trace) - 1, -1, -1.0)
+            self.policy.update_batch(contexts, actions, rewards)
+
+            # Memory keeps the last step first; one bulk append when the
+            # store supports it
+            add_batch = getattr(self.memory, "add_batch", None)
+            if add_batch is not None:
+                add_batch(contexts[::-1], actions[::-1], rewards[::-1])
+            else:
+                for i in range(len(trace) - 1, -1, -1):
+                    self.memory.add(contexts[i], int(actions[i]), float(rewards[i]))
 
     def save_policy(self, path: str) -> None:
         """
         Save the policy state (A, b matrices) to disk.
 
         Args:
-            path: File path to save policy state (without extension).
+            path: File path to save policy state (without extension; the
+                  arrays are written to `path + ".npz"`).
         """
-        import pickle
-
-        policy_state = {
-            "A": self.policy.A,
-            "b": self.policy.b,
-            "n_actions": self.policy.n_actions,
-            "feature_dim": self.policy.feature_dim,
-            "alpha": self.policy.alpha,
-        }
-        with open(f"{path}.pkl", "wb") as f:
-            pickle.dump(policy_state, f)
+        np.savez_compressed(
+            f"{path}.npz",
+            A=self.policy.A,
+            b=self.policy.b,
+            n_actions=self.policy.n_actions,
+            feature_dim=self.policy.feature_dim,
+            alpha=self.policy.alpha,
+            encoding_id=self.encoder.encoding_id,
+        )
 
     def load_policy(self, path: str) -> None:
         """
         Load policy state from disk.
 
+        Reads `path + ".npz"`, falling back to a legacy `path + ".pkl"`.
+
         Args:
             path: File path to load policy state from (without extension).
 
@@ -303,13 +604,18 @@ class LearnableEdge:
             ValueError: If loaded policy state doesn't match current configuration.
         """
         import os
-        import pickle
 
-        if not os.path.exists(f"{path}.pkl"):
-            raise FileNotFoundError(f"Policy file not found: {path}.pkl")
+        if os.path.exists(f"{path}.npz"):
+            # Plain arrays only; nothing in the file is unpickled
+            with np.load(f"{path}.npz", allow_pickle=False) as z:
+                policy_state = {key: z[key] for key in z.files}
+        elif os.path.exists(f"{path}.pkl"):
+            import pickle
 
-        with open(f"{path}.pkl", "rb") as f:
-            policy_state = pickle.load(f)
+            with open(f"{path}.pkl", "rb") as f:
+                policy_state = pickle.load(f)
+        else:
+            raise FileNotFoundError(f"Policy file not found: {path}.npz")
 
         # Validate compatibility
         if policy_state["n_actions"] != self.policy.n_actions:
@@ -323,7 +629,20 @@ class LearnableEdge:
                 f"got {policy_state['feature_dim']}"
             )
 
+        # Same shapes are no guarantee the contexts mean the same thing
+        saved_encoding = policy_state.get("encoding_id")
+        encoding = self.encoder.encoding_id
+        if saved_encoding is not None and str(saved_encoding) != encoding:
+            warnings.warn(
+                f"Policy {path} was trained with encoding '{saved_encoding}', "
+                f"but this edge encodes with '{encoding}'. "
+                "Its routing decisions will not transfer; retrain the policy.",
+                UserWarning,
+                stacklevel=2,
+            )
+
         # Load state
-        self.policy.A = policy_state["A"]
-        self.policy.b = policy_state["b"]
-        self.policy.alpha = policy_state["alpha"]
+        self.policy.A = np.asarray(policy_state["A"], dtype=self.policy.acc_dtype)
+        self.policy.b = np.asarray(policy_state["b"], dtype=self.policy.acc_dtype)
+        self.policy.alpha = float(policy_state["alpha"])
+        self.policy.refresh_cache()
@@ -1,7 +1,12 @@
-from typing import Any
+import math
+import re
+import tempfile
+from typing import Any, Dict, List, Tuple
 
 import numpy as np
 
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
 
 class SentenceTransformerEmbedding:
     """
@@ -12,9 +17,16 @@ class SentenceTransformerEmbedding:
     - Requires `sentence-transformers` to be installed.
     - Uses `normalize_embeddings=True` for stable bandit behavior.
     - Truncates or zero-pads to `dim`.
+    - Single texts run straight through the model's modules (tokenize +
+      forward) under `torch.inference_mode()`, skipping the batching and
+      conversion overhead of `encode`; set `direct=False` to use `encode`.
+      Models with a default prompt or `truncate_dim` always use `encode`,
+      which applies those.
     """
 
-    def __init__(self, model_name: str = "all-MiniLM-L6-v2", dim: int = 32):
+    def __init__(
+        self, model_name: str = "all-MiniLM-L6-v2", dim: int = 32, direct: bool = True
+    ):
         try:
             from sentence_transformers import SentenceTransformer
         except Exception as e:
@@ -23,13 +35,263 @@ class SentenceTransformerEmbedding:
                 "Install with: pip install 'sentence-transformers'"
             ) from e
         self.model = SentenceTransformer(model_name)
+        # encode() switches to eval mode on every call; the direct path
+        # relies on it being set once here (no dropout)
+        self.model.eval()
         self.dim = dim
+        self.direct = direct
 
     def __call__(self, text: str) -> Any:
-        vec = self.model.encode(text, normalize_embeddings=True)
+        if self.direct and self._can_forward():
+            vec = self._forward(text)
+        else:
+            vec = self.model.encode(text, normalize_embeddings=True)
         arr = np.asarray(vec, dtype=np.float32).flatten()
         if arr.shape[0] >= self.dim:
             return arr[: self.dim]
         out = np.zeros(self.dim, dtype=np.float32)
         out[: arr.shape[0]] = arr
         return out
+
+    def _can_forward(self) -> bool:
+        # Prompts and truncate_dim are applied by encode() only
+        model = self.model
+        return (
+            getattr(model, "default_prompt_name", None) is None
+            and getattr(model, "truncate_dim", None) is None
+        )
+
+    def _forward(self, text: str) -> np.ndarray:
+        # The model's own module pipeline (transformer, pooling, ...) gives
+        # encode()'s embedding for models without a default prompt or
+        # truncate_dim, which __call__ routes to encode() instead.
+        import torch
+
+        features = self.model.tokenize([text])
+        device = self.model.device
+        features = {k: v.to(device) for k, v in features.items()}
+        with torch.inference_mode():
+            emb = self.model(features)["sentence_embedding"]
+            emb = torch.nn.functional.normalize(emb, p=2, dim=1)
+        return emb[0].float().cpu().numpy()
+
+    def encode_batch(self, texts: List[str], batch_size: int = 64) -> np.ndarray:
+        """
+        Embed many texts in batched forward passes: (len(texts), dim).
+
+        Texts are sorted by length first so each mini-batch is padded only to
+        its own longest sequence, then rows are restored to input order.
+        """
+        order = np.argsort([len(t) for t in texts], kind="stable")
+        vecs = self.model.encode(
+            [texts[i] for i in order],
+            batch_size=batch_size,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+        )
+        arr = np.empty((len(texts), np.shape(vecs)[-1]), dtype=np.float32)
+        arr[order] = np.asarray(vecs, dtype=np.float32).reshape(len(texts), -1)
+        if arr.shape[1] >= self.dim:
+            return arr[:, : self.dim]
+        return np.pad(arr, ((0, 0), (0, self.dim - arr.shape[1])))
+
+
+class OnnxSentenceEmbedding:
+    """
+    Sentence Transformers model served through ONNX Runtime instead of eager
+    PyTorch, returning a vector shaped to the requested dimension.
+
+    Notes:
+    - Requires `optimum[onnxruntime]` to be installed.
+    - The checkpoint is exported to ONNX once per (model, provider, quantize)
+      and the session is cached on the class.
+    - `quantize=True` applies dynamic INT8 quantization (CPU deployments).
+    - Mean-pools token embeddings and L2-normalizes in NumPy.
+    - Truncates or zero-pads to `dim`.
+    """
+
+    # (tokenizer, session, quantized-model dir kept alive with the session)
+    _sessions: Dict[Tuple[str, str, bool], Tuple[Any, Any, Any]] = {}
+
+    def __init__(
+        self,
+        model_name: str = "sentence-transformers/all-MiniLM-L6-v2",
+        dim: int = 32,
+        provider: str = "CPUExecutionProvider",
+        quantize: bool = False,
+    ):
+        try:
+            from optimum.onnxruntime import ORTModelForFeatureExtraction
+            from transformers import AutoTokenizer
+        except Exception as e:
+            raise ImportError(
+                "optimum[onnxruntime] package is required for OnnxSentenceEmbedding.\n"
+                "Install with: pip install 'optimum[onnxruntime]'"
+            ) from e
+
+        key = (model_name, provider, quantize)
+        if key not in OnnxSentenceEmbedding._sessions:
+            model = ORTModelForFeatureExtraction.from_pretrained(
+                model_name, export=True, provider=provider
+            )
+            workdir = None
+            if quantize:
+                model, workdir = self._quantize(model, provider)
+            tokenizer = AutoTokenizer.from_pretrained(model_name)
+            OnnxSentenceEmbedding._sessions[key] = (tokenizer, model.model, workdir)
+
+        self.tokenizer, self.session, _ = OnnxSentenceEmbedding._sessions[key]
+        self.dim = dim
+        self._input_names: List[str] = []
+
+    @staticmethod
+    def _quantize(model: Any, provider: str) -> Tuple[Any, tempfile.TemporaryDirectory]:
+        from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTQuantizer
+        from optimum.onnxruntime.configuration import AutoQuantizationConfig
+
+        # Removed once the cached session goes away (at the latest, at exit)
+        workdir = tempfile.TemporaryDirectory(prefix="adaptivegraph-onnx-")
+        qconfig = AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+        ORTQuantizer.from_pretrained(model).quantize(
+            save_dir=workdir.name, quantization_config=qconfig
+        )
+        quantized = ORTModelForFeatureExtraction.from_pretrained(
+            workdir.name, file_name="model_quantized.onnx", provider=provider
+        )
+        return quantized, workdir
+
+    def __call__(self, text: str) -> Any:
+        return self.encode_batch([text])[0]
+
+    def encode_batch(self, texts: List[str]) -> np.ndarray:
+        """Embed many texts with one session run: (len(texts), dim)."""
+        if not self._input_names:
+            self._input_names = [i.name for i in self.session.get_inputs()]
+        tokens = self.tokenizer(
+            texts, padding=True, truncation=True, return_tensors="np"
+        )
+        feeds = {name: tokens[name] for name in self._input_names if name in tokens}
+        hidden = self.session.run(None, feeds)[0]
+
+        # Mean pooling over non-padding tokens, then L2 normalize
+        mask = tokens["attention_mask"][..., None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+        sq_norms = np.einsum("bd,bd->b", pooled, pooled)
+        pooled *= (1.0 / np.sqrt(np.maximum(sq_norms, 1e-24)))[:, None]
+
+        arr = pooled.astype(np.float32)
+        if arr.shape[1] >= self.dim:
+            return arr[:, : self.dim]
+        return np.pad(arr, ((0, 0), (0, self.dim - arr.shape[1])))
+
+
+class StaticEmbedding:
+    """
+    Static word-vector embedding: token lookup + mean pooling.
+
+    Orders of magnitude cheaper than a transformer forward pass, which is
+    usually enough signal for picking between a handful of routes.
+
+    Notes:
+    - Loads a text vector file (GloVe `.txt` or fastText `.vec`, header optional).
+    - Tokens are looked up as written, then lowercased, so cased vocabularies
+      keep their capitalized entries.
+    - Unknown tokens map to a zero row; all-unknown text encodes to zeros.
+    - Output is L2-normalized and truncated or zero-padded to `dim`.
+    - With `cache=True` the parsed table is written next to the file
+      (`path + ".npy"` and `path + ".vocab"`); later loads memory-map it
+      instead of parsing the text again.
+    """
+
+    def __init__(self, path: str, dim: int = 32, cache: bool = True):
+        self.dim = dim
+        if cache and self._load_cache(path):
+            return
+
+        # First pass sizes the table, second pass fills it row by row, so
+        # the vectors are never held twice
+        words: List[str] = []
+        width = 0
+        with open(path, encoding="utf-8") as f:
+            for parts in self._rows(f):
+                words.append(parts[0])
+                width = width or len(parts) - 1
+        if not words:
+            raise ValueError(f"No word vectors found in {path}")
+
+        # Row 0 is the zero vector used for out-of-vocabulary tokens
+        self.table = np.zeros((len(words) + 1, width), dtype=np.float32)
+        with open(path, encoding="utf-8") as f:
+            for i, parts in enumerate(self._rows(f), start=1):
+                self.table[i] = np.asarray(parts[1:], dtype=np.float32)
+        self._set_vocab(words)
+
+        if cache:
+            self._write_cache(path, words)
+
+    @staticmethod
+    def _rows(lines: Any) -> Any:
+        first = True
+        for line in lines:
+            parts = line.rstrip().split(" ")
+            if len(parts) == 2 and first:
+                continue  # fastText header: "<n_words> <dim>"
+            if len(parts) < 2:
+                continue
+            first = False
+            yield parts
+
+    def _set_vocab(self, words: List[str]) -> None:
+        self.vocab: Dict[str, int] = {}
+        for i, word in enumerate(words, start=1):
+            self.vocab.setdefault(word, i)
+
+    def _load_cache(self, path: str) -> bool:
+        import os
+
+        table_path, vocab_path = path + ".npy", path + ".vocab"
+        try:
+            source_mtime = os.path.getmtime(path)
+            if (
+                min(os.path.getmtime(table_path), os.path.getmtime(vocab_path))
+                < source_mtime
+            ):
+                return False  # stale: the vector file changed since
+            with open(vocab_path, encoding="utf-8") as f:
+                words = f.read().split("\n")
+            table = np.load(table_path, mmap_mode="r")
+        except (OSError, ValueError):
+            return False
+        if table.shape[0] != len(words) + 1:
+            return False
+        self.table = table
+        self._set_vocab(words)
+        return True
+
+    def _write_cache(self, path: str, words: List[str]) -> None:
+        import os
+
+        # Best effort: a read-only location just means parsing again next time
+        try:
+            with open(path + ".npy.tmp", "wb") as f:
+                np.save(f, self.table)
+            with open(path + ".vocab.tmp", "w", encoding="utf-8") as f:
+                f.write("\n".join(words))
+            os.replace(path + ".npy.tmp", path + ".npy")
+            os.replace(path + ".vocab.tmp", path + ".vocab")
+        except OSError:
+            pass
+
+    def __call__(self, text: str) -> Any:
+        vocab = self.vocab
+        ids = [vocab.get(t) or vocab.get(t.lower(), 0) for t in _TOKEN_RE.findall(text)]
+        out = np.zeros(self.dim, dtype=np.float32)
+        if not ids:
+            return out
+        vec = np.add.reduce(self.table[ids], axis=0) / len(ids)
+        n = min(self.dim, vec.shape[0])
+        out[:n] = vec[:n]
+        sq_norm = float(np.dot(out, out))
+        if sq_norm > 0:
+            out *= 1.0 / math.sqrt(sq_norm)
+        return out
@@ -1,9 +1,82 @@
+import functools
 import hashlib
+import math
 import warnings
-from typing import Any, Callable, Optional
+from typing import Any, Callable, List, Optional, Tuple
 
 import numpy as np
 
+HASH_ALGORITHMS = ("shake256", "xxh3")
+
+
+@functools.lru_cache(maxsize=None)
+def _numba_box_muller_kernel() -> Optional[Callable[..., None]]:
+    """Compile (once) and return the numba Box-Muller kernel, or None."""
+    try:
+        from numba import njit
+    except ImportError:
+        return None
+
+    @njit(cache=True)
+    def _box_muller(words, dim, normalize, out):
+        # Same layout as the NumPy path: cosines first, then sines
+        half = words.shape[0] // 2
+        for i in range(half):
+            u1 = (words[i] + 0.5) / 4294967296.0
+            u2 = (words[half + i] + 0.5) / 4294967296.0
+            r = np.sqrt(-2.0 * np.log(u1))
+            angle = 2.0 * np.pi * u2
+            out[i] = r * np.cos(angle)
+            if half + i < dim:
+                out[half + i] = r * np.sin(angle)
+        if normalize:
+            sq_norm = 0.0
+            for i in range(dim):
+                sq_norm += out[i] * out[i]
+            if sq_norm > 0:
+                scale = 1.0 / np.sqrt(sq_norm)
+                for i in range(dim):
+                    out[i] *= scale
+
+    return _box_muller
+
+
+@functools.lru_cache(maxsize=4096)
+def _hash_vector(
+    state_str: str, dim: int, normalize: bool, algorithm: str = "shake256"
+) -> np.ndarray:
+    """Deterministic pseudo-random vector for `state_str` (cached, read-only)."""
+    data = state_str.encode("utf-8")
+    if algorithm == "xxh3":
+        import xxhash
+
+        # Condense long states to a 16-byte key at memory speed; only the
+        # fixed-size key goes through SHAKE below.
+        data = xxhash.xxh3_128_digest(data)
+
+    # Derive the vector straight from an extendable-output hash instead of
+    # seeding an RNG: identical inputs always produce identical outputs, and
+    # no generator state has to be built per state.
+    n = dim + dim % 2
+    digest = hashlib.shake_256(data).digest(4 * n)
+    words = np.frombuffer(digest, dtype="<u4")
+
+    kernel = _numba_box_muller_kernel()
+    if kernel is not None:
+        vector = np.empty(dim)
+        kernel(words, dim, normalize, vector)
+    else:
+        u = (words + 0.5) / 2**32  # uniforms in (0, 1)
+
+        # Box-Muller: each pair of uniforms gives two standard normals
+        r = np.sqrt(-2.0 * np.log(u[: n // 2]))
+        angle = 2.0 * np.pi * u[n // 2 :]
+        vector = np.concatenate((r * np.cos(angle), r * np.sin(angle)))[:dim]
+        if normalize:
+            StateEncoder._normalize_inplace(vector)
+    vector.setflags(write=False)
+    return vector
+
 
 class StateEncoder:
     """
@@ -15,6 +88,18 @@ class StateEncoder:
     3. Fallback: Deterministic hashing (WARNING: not semantically meaningful)
 
     For production use with text, strongly recommend providing embedding_fn.
+
+    Vectors are returned in `dtype` (float32 by default; float16 halves memory
+    traffic in the policy when it uses the same dtype).
+
+    String states are memoized in an LRU cache of `cache_size` entries (0
+    disables it), since routing workloads repeat the same queries often.
+    Cached vectors are returned read-only.
+
+    `hash_algorithm` selects the fallback hash: "shake256" (default, stdlib)
+    or "xxh3" (requires `xxhash`; much faster on long states). The two give
+    different vectors, so a policy must be served with the algorithm it was
+    trained with.
     """
 
     def __init__(
@@ -22,10 +107,138 @@ class StateEncoder:
         output_dim: int = 32,
         embedding_fn: Optional[Callable[[str], Any]] = None,
         normalize: bool = True,
+        dtype: Any = np.float32,
+        cache_size: int = 4096,
+        hash_algorithm: str = "shake256",
     ):
+        if hash_algorithm not in HASH_ALGORITHMS:
+            raise ValueError(
+                f"Unknown hash_algorithm: '{hash_algorithm}'. "
+                f"Valid: {list(HASH_ALGORITHMS)}"
+            )
+        if hash_algorithm == "xxh3":
+            try:
+                import xxhash  # noqa: F401
+            except ImportError as e:
+                raise ImportError(
+                    "The 'xxhash' package is required for hash_algorithm='xxh3'. "
+                    "Install with: pip install adaptivegraph[xxhash] or pip install xxhash"
+                ) from e
+
         self.output_dim = output_dim
-        self.embedding_fn = embedding_fn
-        self.normalize = normalize
+        self.hash_algorithm = hash_algorithm
+        self._embedding_fn = embedding_fn
+        self._normalize = normalize
+        self.dtype = np.dtype(dtype)
+        self.cache_size = cache_size
+        self._encode_cached = (
+            functools.lru_cache(maxsize=cache_size)(self._encode_str)
+            if cache_size > 0
+            else None
+        )
+        self._rebuild()
+
+    @property
+    def embedding_fn(self) -> Optional[Callable[[str], Any]]:
+        return self._embedding_fn
+
+    @embedding_fn.setter
+    def embedding_fn(self, fn: Optional[Callable[[str], Any]]) -> None:
+        self._embedding_fn = fn
+        self._rebuild()
+
+    @property
+    def normalize(self) -> bool:
+        return self._normalize
+
+    @normalize.setter
+    def normalize(self, value: bool) -> None:
+        self._normalize = value
+        self._rebuild()
+
+    @property
+    def encoding_id(self) -> str:
+        """
+        Identity of the state -> vector mapping, stored with saved policies.
+
+        A policy only makes sense with the encoding it was trained on; this
+        changes whenever that mapping does (embedding, hash algorithm, or the
+        hash derivation itself).
+        """
+        fn = self._embedding_fn
+        if fn is None:
+            source = "none"
+        else:
+            cls = fn if hasattr(fn, "__qualname__") else type(fn)
+            source = f"{cls.__module__}.{cls.__qualname__}"
+        return f"embedding={source};hash={self.hash_algorithm}-box-muller-v2"
+
+    def _rebuild(self) -> None:
+        # embedding_fn and normalize only change through the setters, so the
+        # per-call branches on them are resolved here instead of in encode().
+        self._encode_text, self._encode_hashed = self._make_encoder()
+        self.cache_clear()
+
+        # String states: pick cached or direct encoding once, too
+        if self._encode_cached is not None:
+            cached = self._encode_cached
+
+            def string_into(text: str, out: np.ndarray) -> None:
+                out[:] = cached(text)
+
+            self._string_vector = cached
+            self._string_into = string_into
+        else:
+            encode_text, dim, dtype = self._encode_text, self.output_dim, self.dtype
+
+            def string_vector(text: str) -> np.ndarray:
+                out = np.empty(dim, dtype=dtype)
+                encode_text(text, out)
+                return out
+
+            self._string_vector = string_vector
+            self._string_into = encode_text
+
+    def _make_encoder(
+        self,
+    ) -> Tuple[Callable[[str, np.ndarray], None], Callable[[Any, np.ndarray], None]]:
+        """Return (text, fallback) encoders specialized for the configuration."""
+        fit_into = self._fit_into
+        normalize_inplace = self._normalize_inplace
+        embedding_fn = self._embedding_fn
+        dim, normalize = self.output_dim, self._normalize
+        algorithm = self.hash_algorithm
+
+        def encode_hashed(state: Any, out: np.ndarray) -> None:
+            out[:] = _hash_vector(str(state), dim, normalize, algorithm)
+
+        if embedding_fn is None:
+            return encode_hashed, encode_hashed
+
+        # Expecting embedding_fn to return list or array
+        if self._normalize:
+
+            def encode_text(text: str, out: np.ndarray) -> None:
+                fit_into(np.asarray(embedding_fn(text)).reshape(-1), out)
+                normalize_inplace(out)
+
+        else:
+
+            def encode_text(text: str, out: np.ndarray) -> None:
+                fit_into(np.asarray(embedding_fn(text)).reshape(-1), out)
+
+        return encode_text, encode_hashed
+
+    def cache_clear(self) -> None:
+        """Drop all memoized string encodings (e.g. after swapping embedding_fn)."""
+        if self._encode_cached is not None:
+            self._encode_cached.cache_clear()
+
+    def _encode_str(self, text: str) -> np.ndarray:
+        out = np.empty(self.output_dim, dtype=self.dtype)
+        self._encode_text(text, out)
+        out.setflags(write=False)
+        return out
 
     def encode(self, state: Any) -> np.ndarray:
         """Encode state into a fixed-size vector.
@@ -34,59 +247,90 @@ class StateEncoder:
             state: Input state (numpy array, string, dict, or any object).
 
         Returns:
-            Fixed-size numpy array of shape (output_dim,).
+            Fixed-size, C-contiguous numpy array of shape (output_dim,) in
+            `dtype`, so the policy and stores can use it without recasting.
+            Read-only when it comes from the string cache. An array that is
+            already (output_dim,), C-contiguous and in `dtype` is returned
+            as-is (no copy).
 
         Note:
             - For numpy arrays: flattened and truncated/padded to output_dim.
             - For strings with embedding_fn: embedded using provided function.
             - For other types: deterministic hashing (NOT semantic similarity).
         """
+        if isinstance(state, str):
+            return self._string_vector(state)
+        if (
+            isinstance(state, np.ndarray)
+            and state.shape == (self.output_dim,)
+            and state.dtype == self.dtype
+            and state.flags.c_contiguous
+        ):
+            return state
+
+        out = np.empty(self.output_dim, dtype=self.dtype)
+        self._encode_into(state, out)
+        return out
+
+    def _encode_into(self, state: Any, out: np.ndarray) -> None:
+        """Encode state directly into `out` (shape (output_dim,), `dtype`)."""
+        if isinstance(state, str):
+            self._string_into(state, out)
+            return
+
         if isinstance(state, np.ndarray):
             # If it's already a vector, resize or return (simple pass-through for now)
-            arr = state.flatten()
+            arr = state.reshape(-1)
             if arr.shape[0] > self.output_dim:
                 warnings.warn(
                     f"Truncating vector from {arr.shape[0]} to {self.output_dim} dimensions. "
                     f"Information may be lost.",
                     UserWarning,
                 )
-            return arr[: self.output_dim]
-
-        if self.embedding_fn and isinstance(state, str):
-            # Use provided embedding function
-            # Expecting it to return list or array
-            vec = self.embedding_fn(state)
-            arr = np.asarray(vec, dtype=np.float32).flatten()
-            # Enforce output_dim by truncation/padding
-            if arr.shape[0] >= self.output_dim:
-                arr = arr[: self.output_dim]
-            else:
-                out = np.zeros(self.output_dim, dtype=np.float32)
-                out[: arr.shape[0]] = arr
-                arr = out
-            if self.normalize:
-                norm = np.linalg.norm(arr)
-                if norm > 0:
-                    arr = arr / norm
-            return arr
+            self._fit_into(arr, out)
+            return
 
         # Fallback: Deterministic hashing for string/dict representation
         # WARNING: This creates a random-but-deterministic vector, NOT semantic similarity.
         # Strings like "cat" and "cats" will have completely unrelated vectors.
         # For semantic similarity, use embedding_fn with sentence-transformers or similar.
+        self._encode_hashed(state, out)
 
-        state_str = str(state)
+    def _fit_into(self, arr: np.ndarray, out: np.ndarray) -> None:
+        n = min(arr.shape[0], self.output_dim)
+        out[:n] = arr[:n]
+        out[n:] = 0
 
-        # Create deterministic pseudo-random vector using hash as seed
-        # This ensures identical inputs always produce identical outputs
-        seed = int(hashlib.sha256(state_str.encode("utf-8")).hexdigest(), 16) % (2**32)
-        rng = np.random.RandomState(seed)
-        vector = rng.standard_normal(self.output_dim)
+    @staticmethod
+    def _normalize_inplace(vec: np.ndarray) -> None:
+        # One dot product and one scaled multiply; no temporaries
+        sq_norm = float(np.dot(vec, vec))
+        if sq_norm > 0:
+            vec *= 1.0 / math.sqrt(sq_norm)
 
-        # Normalize
-        if self.normalize:
-            norm = np.linalg.norm(vector)
-            if norm > 0:
-                vector = vector / norm
+    def encode_batch(self, states: List[Any]) -> np.ndarray:
+        """Encode a list of states into a (len(states), output_dim) matrix.
+
+        If every state is a string and `embedding_fn` exposes an
+        `encode_batch(texts)` method, the distinct strings are embedded in one
+        call and duplicates share a row; otherwise each state goes through
+        `encode`.
+        """
+        batch_fn = getattr(self.embedding_fn, "encode_batch", None)
+        if batch_fn is None or not all(isinstance(s, str) for s in states):
+            return np.stack([self.encode(s) for s in states])
+
+        # Routing batches repeat queries often; embed each text only once
+        position = {text: i for i, text in enumerate(dict.fromkeys(states))}
+        unique = list(position)
+        vecs = np.asarray(batch_fn(unique), dtype=self.dtype).reshape(len(unique), -1)
+        if len(unique) < len(states):
+            vecs = vecs[[position[s] for s in states]]
 
-        return vector
+        n = min(vecs.shape[1], self.output_dim)
+        out = np.zeros((len(states), self.output_dim), dtype=self.dtype)
+        out[:, :n] = vecs[:, :n]
+        if self.normalize:
+            sq_norms = np.einsum("bd,bd->b", out, out)[:, None]
+            np.multiply(out, 1.0 / np.sqrt(sq_norms), out=out, where=sq_norms > 0)
+        return out
@@ -1,10 +1,15 @@
 import logging
+import struct
 from typing import Any, Dict, List, Optional, Protocol
 
 import numpy as np
 
 logger = logging.getLogger(__name__)
 
+# FaissExperienceStore write-ahead log record header: action, reward and the
+# pickled metadata length; followed by dim float32s and the metadata bytes
+_WAL_HEADER = struct.Struct("<qdI")
+
 
 class ExperienceStore(Protocol):
     def add(
@@ -27,11 +32,39 @@ class ExperienceStore(Protocol):
 
 
 class InMemoryExperienceStore:
-    def __init__(self):
-        self.contexts: List[np.ndarray] = []
-        self.actions: List[int] = []
-        self.rewards: List[float] = []
+    """
+    Keeps every experience in RAM as growable column arrays.
+
+    Contexts, actions (int32) and rewards (float32) live in preallocated
+    NumPy arrays that double when full, so `add` is a row copy and
+    `get_all` returns views without stacking.
+
+    Args:
+        dim: Context dimension. Inferred from the first `add` when None.
+        dtype: Storage dtype for contexts (default float32).
+        quantize: Store contexts as int8 rows with one float32 scale each
+            (symmetric max-abs quantization, ~4x less memory than float32).
+            `get_all` then returns dequantized copies instead of views.
+    """
+
+    def __init__(
+        self, dim: Optional[int] = None, dtype: Any = np.float32, quantize: bool = False
+    ):
+        self.dim = dim
+        self.dtype = np.dtype(dtype)
+        self.quantize = quantize
+        self._n = 0
+        self._contexts: Optional[np.ndarray] = None
+        self._actions = np.empty(64, dtype=np.int32)
+        self._rewards = np.empty(64, dtype=np.float32)
+        self._scales = np.empty(64, dtype=np.float32) if quantize else None
         self.metadata: List[Optional[Dict[str, Any]]] = []
+        if dim is not None:
+            self._contexts = np.empty((64, dim), dtype=self._storage_dtype)
+
+    @property
+    def _storage_dtype(self) -> np.dtype:
+        return np.dtype(np.int8) if self.quantize else self.dtype
 
     def add(
         self,
@@ -40,14 +73,90 @@ class InMemoryExperienceStore:
         reward: float,
         metadata: Optional[Dict[str, Any]] = None,
     ) -> None:
-        self.contexts.append(context)
-        self.actions.append(action)
-        self.rewards.append(reward)
+        if self._contexts is None:
+            self.dim = int(np.size(context))
+            self._contexts = np.empty(
+                (len(self._actions), self.dim), dtype=self._storage_dtype
+            )
+        if self._n == len(self._actions):
+            self._grow()
+        if self.quantize:
+            self._store_quantized(np.reshape(context, (1, -1)))
+        else:
+            self._contexts[self._n] = np.ravel(context)
+        self._actions[self._n] = action
+        self._rewards[self._n] = reward
         self.metadata.append(metadata)
+        self._n += 1
+
+    def add_batch(
+        self,
+        contexts: np.ndarray,
+        actions: np.ndarray,
+        rewards: np.ndarray,
+        metadata: Optional[List[Optional[Dict[str, Any]]]] = None,
+    ) -> None:
+        """Append many experiences with one slice copy per column."""
+        k = len(actions)
+        contexts = np.reshape(contexts, (k, -1))
+        if self._contexts is None:
+            self.dim = contexts.shape[1]
+            self._contexts = np.empty(
+                (len(self._actions), self.dim), dtype=self._storage_dtype
+            )
+        while self._n + k > len(self._actions):
+            self._grow()
+        if self.quantize:
+            self._store_quantized(contexts)
+        else:
+            self._contexts[self._n : self._n + k] = contexts
+        self._actions[self._n : self._n + k] = actions
+        self._rewards[self._n : self._n + k] = rewards
+        self.metadata.extend(metadata if metadata is not None else [None] * k)
+        self._n += k
+
+    def _store_quantized(self, contexts: np.ndarray) -> None:
+        # Per row, the largest magnitude maps to +/-127; all-zero rows keep
+        # scale 0
+        k = len(contexts)
+        scales = np.max(np.abs(contexts), axis=1) / 127.0
+        rows = self._contexts[self._n : self._n + k]
+        safe = np.where(scales > 0, scales, 1.0)
+        np.rint(contexts / safe[:, None], out=rows, casting="unsafe")
+        self._scales[self._n : self._n + k] = scales
+
+    def _grow(self) -> None:
+        capacity = 2 * len(self._actions)
+        for name in ("_contexts", "_actions", "_rewards", "_scales"):
+            old = getattr(self, name)
+            if old is None:
+                continue
+            new = np.empty((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[: self._n] = old[: self._n]
+            setattr(self, name, new)
+
+    @property
+    def contexts(self) -> np.ndarray:
+        if self._contexts is None:
+            return np.empty((0, 0), dtype=self.dtype)
+        if self.quantize:
+            contexts = self._contexts[: self._n].astype(self.dtype)
+            contexts *= self._scales[: self._n, None]
+            return contexts
+        return self._contexts[: self._n]
+
+    @property
+    def actions(self) -> np.ndarray:
+        return self._actions[: self._n]
+
+    @property
+    def rewards(self) -> np.ndarray:
+        return self._rewards[: self._n]
 
     def get_all(self) -> Dict[str, Any]:
-        # Return stacked arrays for easier processing
-        if not self.contexts:
+        # Views over the live arrays (contexts are a copy when quantized);
+        # copy before mutating
+        if self._n == 0:
             return {
                 "contexts": np.array([]),
                 "actions": np.array([]),
@@ -55,38 +164,93 @@ class InMemoryExperienceStore:
                 "metadata": [],
             }
         return {
-            "contexts": np.stack(self.contexts),
-            "actions": np.array(self.actions),
-            "rewards": np.array(self.rewards),
+            "contexts": self.contexts,
+            "actions": self.actions,
+            "rewards": self.rewards,
             "metadata": self.metadata,
         }
 
     def get_statistics(self) -> Dict[str, Any]:
         return {
             "total_decisions": self.total_decisions,
-            "average_reward": np.mean(self.rewards) if self.rewards else 0.0,
-            "n_actions": len(set(self.actions)),
+            "average_reward": (
+                float(self.rewards.mean(dtype=np.float64)) if self._n else 0.0
+            ),
+            "n_actions": len(np.unique(self.actions)),
         }
 
     @property
     def total_decisions(self) -> int:
-        return len(self.actions)
+        return self._n
 
     @property
     def state_history(self) -> List[np.ndarray]:
-        return self.contexts
+        return list(self.contexts)
 
     def clear(self):
-        self.contexts = []
-        self.actions = []
-        self.rewards = []
+        self._n = 0
         self.metadata = []
 
 
+class _DiskContexts:
+    """
+    Append-only (n, dim) float32 rows backed by a memory-mapped file.
+
+    Capacity grows geometrically by extending the file, so only the pages
+    being touched need to be resident.
+    """
+
+    def __init__(self, path: str, dim: int, n: int = 0):
+        import os
+
+        self.path = path
+        self.dim = dim
+        self._n = n
+        row_bytes = dim * np.dtype(np.float32).itemsize
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        capacity = max(size // row_bytes, n, 1024)
+        self._map(capacity)
+
+    def _map(self, capacity: int) -> None:
+        row_bytes = self.dim * np.dtype(np.float32).itemsize
+        with open(self.path, "ab") as f:
+            f.truncate(max(capacity * row_bytes, f.seek(0, 2)))
+        self._rows = np.memmap(
+            self.path, dtype=np.float32, mode="r+", shape=(capacity, self.dim)
+        )
+
+    def extend(self, rows: np.ndarray) -> None:
+        n = len(rows)
+        while self._n + n > self._rows.shape[0]:
+            self._rows.flush()
+            self._map(2 * self._rows.shape[0])
+        self._rows[self._n : self._n + n] = rows
+        self._n += n
+
+    def view(self) -> np.ndarray:
+        return self._rows[: self._n]
+
+    def flush(self) -> None:
+        self._rows.flush()
+
+    def clear(self) -> None:
+        self._n = 0
+
+    def __len__(self) -> int:
+        return self._n
+
+    def __getitem__(self, i):
+        return self.view()[i]
+
+    def __iter__(self):
+        return iter(self.view())
+
+
 class FaissExperienceStore:
     """
-    Simple local FAISS-backed store. Keeps vectors in an index and mirrors
-    actions/rewards/metadata in Python lists.
+    Simple local FAISS-backed store. Keeps vectors only in the index (rows
+    are reconstructed from it for `get_all`), actions/rewards in growable
+    NumPy arrays and metadata in a Python list.
 
     Requirements: `faiss-cpu` package.
     Metric: cosine similarity implemented via normalized vectors and inner product (IP).
@@ -95,8 +259,29 @@ class FaissExperienceStore:
         dim: Dimension of vectors.
         metric: Distance metric ('cosine' recommended).
         persist_path: Path to save index and metadata (without extension).
-        auto_save: If True, save after every add(). If False, call save() manually.
-                   Set to False for better performance with frequent updates.
+        auto_save: If True, every add() is appended to a write-ahead log
+                   (`persist_path + ".log"`) and the full index is checkpointed
+                   every `checkpoint_every` adds. If False, call save() manually.
+        index_type: "hnsw" (default) for sub-linear approximate search without a
+                    training step, or "flat" for exact brute-force search.
+        hnsw_m: Graph degree of the HNSW index.
+        ef_search: HNSW search beam width; higher raises recall at some
+                   latency cost.
+        device: "auto" (default) places a flat index on all visible GPUs when
+                faiss was built with CUDA support, "cuda" requires it, "cpu"
+                never moves it. HNSW indexes are CPU-only.
+        on_disk: Also keep stored contexts in a memory-mapped file
+                 (`persist_path + ".ctx"`) that `get_all` returns as a view,
+                 and memory-map the index when loading it. Requires
+                 persist_path.
+        buffer_size: New vectors are staged and added to the index in chunks of
+                     this many rows; `flush()` (called by `query_similar` and
+                     `save`) pushes a partial chunk.
+        checkpoint_every: With auto_save, rewrite the index and metadata after
+                          this many logged adds and truncate the log.
+        n_threads: If set, the number of OpenMP threads faiss uses for
+                   searches and adds. This is a process-wide faiss setting;
+                   None leaves it untouched.
     """
 
     def __init__(
@@ -105,6 +290,14 @@ class FaissExperienceStore:
         metric: str = "cosine",
         persist_path: Optional[str] = None,
         auto_save: bool = True,
+        index_type: str = "hnsw",
+        hnsw_m: int = 32,
+        ef_search: int = 64,
+        device: str = "auto",
+        on_disk: bool = False,
+        buffer_size: int = 256,
+        checkpoint_every: int = 1024,
+        n_threads: Optional[int] = None,
     ):
         try:
             import faiss  # type: ignore
@@ -114,22 +307,71 @@ class FaissExperienceStore:
                 "Install with: pip install 'faiss-cpu'"
             ) from e
 
+        if index_type not in ("hnsw", "flat"):
+            raise ValueError(
+                f"Unknown index_type: '{index_type}'. Valid: ['hnsw', 'flat']"
+            )
+        if on_disk and not persist_path:
+            raise ValueError("on_disk=True requires a persist_path")
+
         self.dim = dim
         self.metric = metric
         self._faiss = faiss
         self.persist_path = persist_path
         self.auto_save = auto_save
+        self.index_type = index_type
+        self.ef_search = ef_search
+        self.on_disk = on_disk
+        self.device = self._resolve_device(device)
+        if n_threads is not None:
+            faiss.omp_set_num_threads(max(int(n_threads), 1))
 
         # Use inner-product index; for cosine, inputs should be normalized
-        self.index = faiss.IndexFlatIP(dim)
-        self.contexts: List[np.ndarray] = []
-        self.actions: List[int] = []
-        self.rewards: List[float] = []
+        if index_type == "hnsw":
+            self.index = faiss.IndexHNSWFlat(dim, hnsw_m, faiss.METRIC_INNER_PRODUCT)
+            self.index.hnsw.efConstruction = 40
+            self.index.hnsw.efSearch = ef_search
+        else:
+            self.index = faiss.IndexFlatIP(dim)
+        if self.device == "cuda":
+            self.index = faiss.index_cpu_to_all_gpus(self.index)
+        self._disk_contexts = (
+            _DiskContexts(persist_path + ".ctx", dim) if on_disk else None
+        )
+        self._n = 0
+        self._actions = np.empty(64, dtype=np.int32)
+        self._rewards = np.empty(64, dtype=np.float32)
         self.metadata: List[Optional[Dict[str, Any]]] = []
 
+        # Vectors not yet handed to the index; one index.add per chunk
+        self._pending = np.empty((max(buffer_size, 1), dim), dtype=np.float32)
+        self._pending_n = 0
+
+        # Write-ahead log of adds since the last checkpoint (auto_save only)
+        self.checkpoint_every = max(checkpoint_every, 1)
+        self._wal: Any = None
+        self._wal_n = 0
+
         if self.persist_path:
             self._load()
 
+    def _resolve_device(self, device: str) -> str:
+        if device not in ("auto", "cpu", "cuda"):
+            raise ValueError(
+                f"Unknown device: '{device}'. Valid: ['auto', 'cpu', 'cuda']"
+            )
+        if device == "cpu":
+            return "cpu"
+        if self.index_type != "flat":
+            if device == "cuda":
+                raise ValueError("device='cuda' requires index_type='flat'")
+            return "cpu"
+
+        n_gpus = int(getattr(self._faiss, "get_num_gpus", lambda: 0)())
+        if device == "cuda" and n_gpus == 0:
+            raise ValueError("device='cuda' requested but faiss sees no GPUs")
+        return "cuda" if n_gpus > 0 else "cpu"
+
     def _load(self):
         import os
         import pickle
@@ -138,32 +380,100 @@ class FaissExperienceStore:
             self.persist_path + ".pkl"
         ):
             try:
-                self.index = self._faiss.read_index(self.persist_path + ".index")
+                if self.on_disk:
+                    self.index = self._faiss.read_index(
+                        self.persist_path + ".index", self._faiss.IO_FLAG_MMAP
+                    )
+                else:
+                    self.index = self._faiss.read_index(self.persist_path + ".index")
+                if hasattr(self.index, "hnsw"):
+                    self.index.hnsw.efSearch = self.ef_search
+                if self.device == "cuda":
+                    self.index = self._faiss.index_cpu_to_all_gpus(self.index)
                 with open(self.persist_path + ".pkl", "rb") as f:
                     data = pickle.load(f)
-                    self.contexts = data["contexts"]
-                    self.actions = data["actions"]
-                    self.rewards = data["rewards"]
+                    if self.on_disk:
+                        self._disk_contexts = _DiskContexts(
+                            self.persist_path + ".ctx", self.dim, len(data["actions"])
+                        )
+                    self._set_columns(data["actions"], data["rewards"])
                     self.metadata = data["metadata"]
             except Exception as e:
                 logger.warning(
                     f"Failed to load persistence file {self.persist_path}: {e}"
                 )
+        if os.path.exists(self.persist_path + ".log"):
+            self._replay_log()
+
+    def _replay_log(self) -> None:
+        import pickle
+
+        with open(self.persist_path + ".log", "rb") as f:
+            data = f.read()
+
+        vec_bytes = 4 * self.dim
+        offset = 0
+        while offset + _WAL_HEADER.size <= len(data):
+            action, reward, meta_len = _WAL_HEADER.unpack_from(data, offset)
+            start = offset + _WAL_HEADER.size
+            end = start + vec_bytes + meta_len
+            if end > len(data):
+                break  # torn final record from an interrupted write
+            vec = np.frombuffer(data, dtype=np.float32, count=self.dim, offset=start)
+            metadata = pickle.loads(data[start + vec_bytes : end])
+            self._append(vec, action, reward, metadata)
+            self._wal_n += 1
+            offset = end
+
+    def flush(self) -> None:
+        """Add any staged vectors to the index."""
+        if self._pending_n:
+            block = self._pending[: self._pending_n]
+            if self.metric == "cosine":
+                # One SIMD pass normalizes the whole block in place
+                self._faiss.normalize_L2(block)
+            self.index.add(block)
+            if self.on_disk:
+                self._disk_contexts.extend(block)
+            self._pending_n = 0
 
     def save(self):
+        """Checkpoint the index and metadata, then truncate the add log."""
         if not self.persist_path:
             return
+        import os
         import pickle
 
-        self._faiss.write_index(self.index, self.persist_path + ".index")
+        self.flush()
+
+        index = self.index
+        if self.device == "cuda":
+            index = self._faiss.index_gpu_to_cpu(index)
+        # Write to temporary files and swap them in, so a crash mid-save
+        # leaves the previous checkpoint (plus its log) intact
+        self._faiss.write_index(index, self.persist_path + ".index.tmp")
+        if self.on_disk:
+            self._disk_contexts.flush()
         data = {
-            "contexts": self.contexts,
+            # Contexts live in the index (and the .ctx file when on_disk)
+            "contexts": None,
             "actions": self.actions,
             "rewards": self.rewards,
             "metadata": self.metadata,
         }
-        with open(self.persist_path + ".pkl", "wb") as f:
-            pickle.dump(data, f)
+        # Buffers are still pickled in-band; protocol 5 just skips the
+        # intermediate bytes copy of each array view while doing so
+        with open(self.persist_path + ".pkl.tmp", "wb") as f:
+            pickle.dump(data, f, protocol=5)
+        os.replace(self.persist_path + ".index.tmp", self.persist_path + ".index")
+        os.replace(self.persist_path + ".pkl.tmp", self.persist_path + ".pkl")
+
+        if self._wal is not None:
+            self._wal.seek(0)
+            self._wal.truncate()
+        elif os.path.exists(self.persist_path + ".log"):
+            os.remove(self.persist_path + ".log")
+        self._wal_n = 0
 
     def add(
         self,
@@ -172,23 +482,113 @@ class FaissExperienceStore:
         reward: float,
         metadata: Optional[Dict[str, Any]] = None,
     ) -> None:
-        # Normalize for cosine if needed
-        vec = context.astype(np.float32)
-        if self.metric == "cosine":
-            n = np.linalg.norm(vec)
-            if n > 0:
-                vec = vec / n
-        self.index.add(vec.reshape(1, -1))
-        self.contexts.append(vec)
-        self.actions.append(action)
-        self.rewards.append(reward)
-        self.metadata.append(metadata)
+        self._append(context, action, reward, metadata)
+        if self.persist_path and self.auto_save:
+            self._log_adds(np.reshape(context, (1, -1)), [action], [reward], [metadata])
+
+    def add_batch(
+        self,
+        contexts: np.ndarray,
+        actions: np.ndarray,
+        rewards: np.ndarray,
+        metadata: Optional[List[Optional[Dict[str, Any]]]] = None,
+    ) -> None:
+        """Append many experiences; vectors go through the staging block in slices."""
+        k = len(actions)
+        contexts = np.reshape(contexts, (k, self.dim))
+        metadata = metadata if metadata is not None else [None] * k
+
+        i = 0
+        while i < k:
+            take = min(k - i, len(self._pending) - self._pending_n)
+            self._pending[self._pending_n : self._pending_n + take] = contexts[
+                i : i + take
+            ]
+            self._pending_n += take
+            i += take
+            if self._pending_n == len(self._pending):
+                self.flush()
+
+        if self._n + k > len(self._actions):
+            self._set_columns(
+                self.actions, self.rewards, max(2 * len(self._actions), self._n + k)
+            )
+        self._actions[self._n : self._n + k] = actions
+        self._rewards[self._n : self._n + k] = rewards
+        self._n += k
+        self.metadata.extend(metadata)
 
         if self.persist_path and self.auto_save:
+            self._log_adds(contexts, actions, rewards, metadata)
+
+    def _append(
+        self,
+        context: np.ndarray,
+        action: int,
+        reward: float,
+        metadata: Optional[Dict[str, Any]],
+    ) -> None:
+        # Cast straight into the staging row; flush() normalizes the block
+        self._pending[self._pending_n] = context
+        self._pending_n += 1
+        if self._pending_n == len(self._pending):
+            self.flush()
+        if self._n == len(self._actions):
+            self._set_columns(self.actions, self.rewards, 2 * self._n)
+        self._actions[self._n] = action
+        self._rewards[self._n] = reward
+        self._n += 1
+        self.metadata.append(metadata)
+
+    def _log_adds(
+        self,
+        contexts: np.ndarray,
+        actions: Any,
+        rewards: Any,
+        metadata: List[Optional[Dict[str, Any]]],
+    ) -> None:
+        """Append adds already applied in memory to the log: O(dim) I/O each."""
+        import os
+        import pickle
+
+        if self._wal_n + len(metadata) >= self.checkpoint_every:
             self.save()
+            return
+        if self._wal is None:
+            # Checkpoint first when none exists yet, so the log has a base
+            if not os.path.exists(self.persist_path + ".index"):
+                self.save()
+                return
+            self._wal = open(self.persist_path + ".log", "ab")
+        vecs = np.asarray(contexts, dtype=np.float32)
+        for vec, action, reward, meta in zip(vecs, actions, rewards, metadata):
+            blob = pickle.dumps(meta, protocol=5)
+            self._wal.write(_WAL_HEADER.pack(int(action), float(reward), len(blob)))
+            self._wal.write(vec.tobytes())
+            self._wal.write(blob)
+        self._wal.flush()
+        self._wal_n += len(metadata)
+
+    def _set_columns(self, actions: Any, rewards: Any, capacity: int = 64) -> None:
+        """Copy actions/rewards into fresh column arrays of at least `capacity`."""
+        n = len(actions)
+        self._actions = np.empty(max(capacity, n), dtype=np.int32)
+        self._rewards = np.empty(max(capacity, n), dtype=np.float32)
+        self._actions[:n] = actions
+        self._rewards[:n] = rewards
+        self._n = n
+
+    @property
+    def actions(self) -> np.ndarray:
+        return self._actions[: self._n]
+
+    @property
+    def rewards(self) -> np.ndarray:
+        return self._rewards[: self._n]
 
     def get_all(self) -> Dict[str, Any]:
-        if not self.contexts:
+        # actions/rewards are views over the live arrays; copy before mutating
+        if self._n == 0:
             return {
                 "contexts": np.array([]),
                 "actions": np.array([]),
@@ -196,43 +596,83 @@ class FaissExperienceStore:
                 "metadata": [],
             }
         return {
-            "contexts": np.stack(self.contexts),
-            "actions": np.array(self.actions),
-            "rewards": np.array(self.rewards),
+            "contexts": self._stacked_contexts(),
+            "actions": self.actions,
+            "rewards": self.rewards,
             "metadata": self.metadata,
         }
 
+    def _stacked_contexts(self) -> np.ndarray:
+        """(N, dim) history; one bulk copy out of the index, no per-row work."""
+        self.flush()
+        if self.on_disk:
+            return self._disk_contexts.view()
+        return self.index.reconstruct_n(0, self.index.ntotal)
+
     def get_statistics(self) -> Dict[str, Any]:
         return {
             "total_decisions": self.total_decisions,
-            "average_reward": np.mean(self.rewards) if self.rewards else 0.0,
-            "n_actions": len(set(self.actions)),
+            "average_reward": (
+                float(self.rewards.mean(dtype=np.float64)) if self._n else 0.0
+            ),
+            "n_actions": len(np.unique(self.actions)),
         }
 
     @property
     def total_decisions(self) -> int:
-        return len(self.actions)
+        return self._n
 
     @property
     def state_history(self) -> List[np.ndarray]:
-        return self.contexts
-
-    def query_similar(self, context: np.ndarray, k: int = 5) -> Dict[str, Any]:
-        vec = context.astype(np.float32)
-        if self.metric == "cosine":
-            n = np.linalg.norm(vec)
-            if n > 0:
-                vec = vec / n
-        if len(self.contexts) == 0:
+        return list(self._stacked_contexts()) if self._n else []
+
+    def query_similar(
+        self, context: np.ndarray, k: int = 5, ef_search: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Find the k stored contexts most similar to `context`.
+
+        `ef_search` overrides the HNSW beam width for this query only
+        (ignored by flat indexes).
+        """
+        if self._n == 0:
             return {"indices": np.array([]), "scores": np.array([])}
-        distances, indices = self.index.search(vec.reshape(1, -1), k)
-        return {"indices": indices[0], "scores": distances[0]}
+        result = self.query_similar_batch(
+            np.reshape(context, (1, -1)), k=k, ef_search=ef_search
+        )
+        return {"indices": result["indices"][0], "scores": result["scores"][0]}
+
+    def query_similar_batch(
+        self, contexts: np.ndarray, k: int = 5, ef_search: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Find the k most similar stored contexts for each row of `contexts`.
+
+        All queries go to the index in one search call. Returns (n, k)
+        "indices" and "scores" arrays.
+        """
+        if self.metric == "cosine":
+            # normalize_L2 works in place, so normalize a private copy
+            queries = np.array(contexts, dtype=np.float32, ndmin=2)
+            self._faiss.normalize_L2(queries)
+        else:
+            queries = np.ascontiguousarray(np.atleast_2d(contexts), dtype=np.float32)
+        if self._n == 0:
+            empty = np.empty((len(queries), 0))
+            return {"indices": empty.astype(np.int64), "scores": empty}
+        self.flush()
+        params = None
+        if ef_search is not None and hasattr(self.index, "hnsw"):
+            params = self._faiss.SearchParametersHNSW(efSearch=ef_search)
+        distances, indices = self.index.search(queries, k, params=params)
+        return {"indices": indices, "scores": distances}
 
     def clear(self):
         self.index.reset()
-        self.contexts = []
-        self.actions = []
-        self.rewards = []
+        self._pending_n = 0
+        if self.on_disk:
+            self._disk_contexts.clear()
+        self._n = 0
         self.metadata = []
 
         if self.persist_path:
@@ -242,3 +682,9 @@ class FaissExperienceStore:
                 os.remove(self.persist_path + ".index")
             if os.path.exists(self.persist_path + ".pkl"):
                 os.remove(self.persist_path + ".pkl")
+            if self._wal is not None:
+                self._wal.close()
+                self._wal = None
+            if os.path.exists(self.persist_path + ".log"):
+                os.remove(self.persist_path + ".log")
+            self._wal_n = 0
@@ -1,12 +1,81 @@
-import random
-from typing import Protocol
+import functools
+from typing import Any, Callable, Optional, Protocol
 
 import numpy as np
 
+# At small d the per-call dispatch overhead of NumPy/BLAS dominates the
+# arithmetic, so contexts up to this size are scored by a JIT kernel when
+# numba is installed.
+NUMBA_MAX_DIM = 32
+
+
+@functools.lru_cache(maxsize=None)
+def _numba_ucb_kernel() -> Optional[Callable[..., None]]:
+    """Compile (once) and return the numba UCB scoring kernel, or None."""
+    try:
+        from numba import njit
+    except ImportError:
+        return None
+
+    @njit(cache=True, fastmath=True)
+    def _ucb_scores(A_inv, theta, x, alpha, out):
+        K, d = theta.shape
+        for a in range(K):
+            expected = 0.0
+            quad = 0.0
+            for i in range(d):
+                expected += theta[a, i] * x[i]
+                row = 0.0
+                for j in range(d):
+                    row += A_inv[a, i, j] * x[j]
+                quad += row * x[i]
+            out[a] = expected + alpha * np.sqrt(max(quad, 0.0))
+
+    return _ucb_scores
+
+
+@functools.lru_cache(maxsize=None)
+def _numba_update_kernel() -> Optional[Callable[..., None]]:
+    """Compile (once) and return the fused numba rank-1 update kernel, or None."""
+    try:
+        from numba import njit
+    except ImportError:
+        return None
+
+    @njit(cache=True, fastmath=True)
+    def _rank1_update(A, b, A_inv, theta, x, reward):
+        # One sweep over the (d, d) arrays applies A += x x^T and the
+        # Sherman-Morrison step on A^-1; LLVM vectorizes the inner loops.
+        d = x.shape[0]
+        v = np.empty(d, dtype=A_inv.dtype)
+        denom = 1.0
+        for i in range(d):
+            acc = 0.0
+            for j in range(d):
+                acc += A_inv[i, j] * x[j]
+            v[i] = acc
+            denom += acc * x[i]
+        for i in range(d):
+            b[i] += reward * x[i]
+            xi = x[i]
+            vi = v[i] / denom
+            for j in range(d):
+                A[i, j] += xi * x[j]
+                A_inv[i, j] -= vi * v[j]
+        for i in range(d):
+            acc = 0.0
+            for j in range(d):
+                acc += A_inv[i, j] * b[j]
+            theta[i] = acc
+
+    return _rank1_update
+
 
 class BanditPolicy(Protocol):
     def select_action(self, context: np.ndarray) -> int: ...
 
+    def select_action_batch(self, contexts: np.ndarray) -> np.ndarray: ...
+
     def update(self, context: np.ndarray, action: int, reward: float) -> None: ...
 
 
@@ -21,31 +90,117 @@ class LinUCBPolicy:
         feature_dim: Dimension of context vectors.
         alpha: Exploration parameter (higher = more exploration).
         ridge_lambda: Regularization parameter for ridge regression (default 1.0).
+        dtype: Storage dtype for the cached A^-1 and theta that scoring reads
+               (default float32). float16 halves memory traffic again. The
+               A and b accumulators are kept in at least float32 (float16
+               stops counting above 2048), and factorizations always run in
+               float64 and are cast back.
+        seed: Seed for the generator that breaks ties between equally scored
+              arms, shared by single and batched selection. None draws
+              fresh entropy.
     """
 
+    # Fixed attribute set: no per-instance __dict__, faster attribute reads
+    __slots__ = (
+        "dtype",
+        "acc_dtype",
+        "n_actions",
+        "feature_dim",
+        "alpha",
+        "ridge_lambda",
+        "A",
+        "b",
+        "A_inv",
+        "theta",
+        "_updates_since_refresh",
+        "_outer",
+        "_vec",
+        "_ucb_kernel",
+        "_update_kernel",
+        "_rng",
+    )
+
     def __init__(
         self,
         n_actions: int,
         feature_dim: int = 32,
         alpha: float = 1.0,
         ridge_lambda: float = 1.0,
+        dtype: Any = np.float32,
+        seed: Optional[int] = None,
     ):
+        self.dtype = np.dtype(dtype)
+        if not np.issubdtype(self.dtype, np.floating):
+            raise ValueError(f"dtype must be a floating point type, got {self.dtype}")
+        # Running sums need more headroom than the cached factors
+        self.acc_dtype = np.promote_types(self.dtype, np.float32)
+
         self.n_actions = n_actions
         self.feature_dim = feature_dim
         self.alpha = alpha
         self.ridge_lambda = ridge_lambda
+        self._rng = np.random.default_rng(seed)
 
         # Initialize A as identity matrices scaled by ridge_lambda for each arm
-        # Using a 3D array for efficiency: (n_actions, dim, dim)
-        self.A = np.array(
-            [ridge_lambda * np.eye(feature_dim) for _ in range(n_actions)]
+        # Stored as one stacked array (n_actions, dim, dim) so every per-arm
+        # linear algebra op below is a single batched NumPy call.
+        self.A = np.tile(
+            ridge_lambda * np.eye(feature_dim, dtype=self.acc_dtype),
+            (n_actions, 1, 1),
         )
 
         # Initialize b as zero vectors: (n_actions, dim)
-        self.b = np.zeros((n_actions, feature_dim))
+        self.b = np.zeros((n_actions, feature_dim), dtype=self.acc_dtype)
+
+        # A only changes in update(), so cache A^-1 and theta = A^-1 b per arm
+        # instead of re-solving both systems on every select_action call.
+        self.A_inv = np.empty_like(self.A, dtype=self.dtype)
+        self.theta = np.empty_like(self.b, dtype=self.dtype)
+        self.refresh_cache()
 
-        # Pre-compute inverse? No, do it lazily or use solve.
-        # For small d (32), solve is fast.
+        # update() keeps A_inv current with O(d^2) Sherman-Morrison steps and
+        # refactors an arm exactly once every feature_dim updates to bound
+        # rounding drift (amortized cost stays O(d^2)).
+        self._updates_since_refresh = np.zeros(n_actions, dtype=np.int64)
+
+        # Scratch buffers so rank-1 updates don't allocate per call
+        self._outer = np.empty((feature_dim, feature_dim), dtype=self.acc_dtype)
+        self._vec = np.empty((2, feature_dim), dtype=self.acc_dtype)
+
+        # Optional numba kernels (numba has no float16): low-d scoring, and
+        # the fused rank-1 update at any d
+        self._ucb_kernel = None
+        self._update_kernel = None
+        if self.dtype != np.float16:
+            self._update_kernel = _numba_update_kernel()
+            if feature_dim <= NUMBA_MAX_DIM:
+                self._ucb_kernel = _numba_ucb_kernel()
+
+    def reset(self) -> None:
+        """Forget all updates, reusing the existing arrays."""
+        self.A[:] = self.ridge_lambda * np.eye(self.feature_dim, dtype=self.acc_dtype)
+        self.b[:] = 0
+        self.refresh_cache()
+        self._updates_since_refresh[:] = 0
+
+    def refresh_cache(self) -> None:
+        """
+        Recompute the cached A^-1 and theta for every arm.
+
+        Call this after replacing A or b directly (e.g. when loading a policy).
+        """
+        # A is symmetric positive definite (ridge init + rank-1 updates), so
+        # invert through its Cholesky factor: A^-1 = L^-T L^-1
+        L_inv = np.linalg.inv(np.linalg.cholesky(self.A.astype(np.float64)))
+        A_inv = np.swapaxes(L_inv, -1, -2) @ L_inv
+        self.A_inv[:] = A_inv
+        self.theta[:] = np.einsum("kij,kj->ki", A_inv, self.b)
+
+    def _refresh_arm(self, action: int) -> None:
+        L_inv = np.linalg.inv(np.linalg.cholesky(self.A[action].astype(np.float64)))
+        A_inv = L_inv.T @ L_inv
+        self.A_inv[action] = A_inv
+        self.theta[action] = A_inv @ self.b[action]
 
     def select_action(self, context: np.ndarray) -> int:
         """
@@ -60,37 +215,70 @@ class LinUCBPolicy:
         Returns:
             Index of selected action (0 to n_actions-1).
         """
-        # Context shape: (d,)
-        # We need to compute p_a for all a
-
-        p_values = []
-        for a in range(self.n_actions):
-            A_a = self.A[a]
-            b_a = self.b[a]
-
-            # Compute A_a_inv * x and A_a_inv * b_a
-            # Ideally use solve
-            try:
-                # theta_a = np.linalg.solve(A_a, b_a)
-                # But we also need x.T * A_a_inv * x.
-                # Let v = A_a_inv * x => solve(A_a, x)
-
-                A_inv_x = np.linalg.solve(A_a, context)
-                theta_a = np.linalg.solve(A_a, b_a)
-
-                expected_reward = np.dot(theta_a, context)
-                uncertainty = self.alpha * np.sqrt(np.dot(context, A_inv_x))
-
-                p = expected_reward + uncertainty
-                p_values.append(p)
-            except np.linalg.LinAlgError:
-                # Fallback if singular (rare with ridge init)
-                p_values.append(float("-inf"))
-
-        # Argmax with random tie-breaking
-        max_p = np.max(p_values)
-        candidates = [i for i, p in enumerate(p_values) if p == max_p]
-        return int(random.choice(candidates))
+        # Match the storage dtype so NumPy doesn't upcast (and copy) A_inv.
+        x = np.asarray(context, dtype=self.dtype)
+        scores = np.empty((2, self.n_actions), dtype=self.dtype)
+        work = np.empty((self.n_actions, self.feature_dim), dtype=self.dtype)
+        return self._select_into(x, scores, work)
+
+    def _select_into(self, x: np.ndarray, scores: np.ndarray, work: np.ndarray) -> int:
+        """
+        select_action for a context already in `dtype`, scoring into buffers.
+
+        `scores` must have shape (2, n_actions) and `work` (n_actions,
+        feature_dim), both in `dtype`; callers that route at high rates keep
+        them around so scoring allocates nothing.
+        """
+        if self.n_actions == 1:
+            return 0  # nothing to choose between
+
+        # Score every arm from the cached factors: (n_actions,)
+        p_values = scores[0]
+        if self._ucb_kernel is not None:
+            self._ucb_kernel(self.A_inv, self.theta, x, float(self.alpha), p_values)
+        else:
+            uncertainty = scores[1]
+            np.matmul(self.A_inv, x, out=work)
+            np.matmul(work, x, out=uncertainty)
+            np.maximum(uncertainty, 0, out=uncertainty)
+            np.sqrt(uncertainty, out=uncertainty)
+            uncertainty *= self.alpha
+            np.matmul(self.theta, x, out=p_values)
+            p_values += uncertainty
+
+        # Argmax with random tie-breaking; one C-level pass, and the tie scan
+        # only draws a random number when several arms share the maximum
+        best = int(np.argmax(p_values))
+        ties = np.flatnonzero(p_values == p_values[best])
+        if len(ties) > 1:
+            best = int(ties[self._rng.integers(len(ties))])
+        return best
+
+    def select_action_batch(self, contexts: np.ndarray) -> np.ndarray:
+        """
+        Select actions for a batch of contexts at once.
+
+        Args:
+            contexts: Context matrix of shape (batch, feature_dim).
+
+        Returns:
+            Array of selected action indices, shape (batch,).
+        """
+        X = np.asarray(contexts, dtype=self.dtype)
+        if self.n_actions == 1:
+            return np.zeros(X.shape[0], dtype=np.int64)
+
+        # (batch, n_actions) scores for every context against every arm
+        expected_reward = X @ self.theta.T
+        A_inv_x = np.einsum("kij,bj->bki", self.A_inv, X)
+        uncertainty = self.alpha * np.sqrt(
+            np.maximum(np.einsum("bki,bi->bk", A_inv_x, X), 0)
+        )
+        p_values = expected_reward + uncertainty
+
+        # Random tie-breaking: random weights on the maxima of each row only
+        is_max = p_values == p_values.max(axis=1, keepdims=True)
+        return np.argmax(self._rng.random(is_max.shape) * is_max, axis=1)
 
     def update(self, context: np.ndarray, action: int, reward: float) -> None:
         """
@@ -106,9 +294,78 @@ class LinUCBPolicy:
         if action < 0 or action >= self.n_actions:
             return
 
-        # Update A += x * x.T
+        x = np.asarray(context, dtype=self.acc_dtype)
+
+        self._updates_since_refresh[action] += 1
+        refresh = self._updates_since_refresh[action] >= self.feature_dim
+        if self._update_kernel is not None and not refresh:
+            self._update_kernel(
+                self.A[action],
+                self.b[action],
+                self.A_inv[action],
+                self.theta[action],
+                x,
+                float(reward),
+            )
+            return
+
+        # Update A += x * x.T (in place through the scratch buffer)
         # Update b += r * x
+        np.multiply.outer(x, x, out=self._outer)
+        self.A[action] += self._outer
+        self.b[action] += np.multiply(x, reward, out=self._vec[0])
+
+        if refresh:
+            self._refresh_arm(action)
+            self._updates_since_refresh[action] = 0
+            return
+
+        # Sherman-Morrison: (A + x x^T)^-1 = A^-1 - (A^-1 x)(A^-1 x)^T / (1 + x^T A^-1 x)
+        A_inv = self.A_inv[action]
+        v = np.matmul(A_inv, x, out=self._vec[0])
+        scaled = np.multiply(v, 1.0 / (1.0 + float(v @ x)), out=self._vec[1])
+        np.multiply.outer(v, scaled, out=self._outer)
+        A_inv -= self._outer
+        np.matmul(A_inv, self.b[action], out=self.theta[action])
+
+    def update_batch(
+        self, contexts: np.ndarray, actions: np.ndarray, rewards: np.ndarray
+    ) -> None:
+        """
+        Apply many (context, action, reward) updates at once.
+
+        Equivalent to calling `update` for each row, but every arm touched
+        gets a single A_a += C^T C, b_a += r @ C. Its cached A^-1 follows
+        with one rank-k Woodbury step, or one exact refactor once the arm
+        has accumulated feature_dim low-rank updates.
+
+        Args:
+            contexts: Context matrix of shape (n, feature_dim).
+            actions: Action index per row, shape (n,).
+            rewards: Reward per row, shape (n,).
+        """
+        X = np.asarray(contexts, dtype=self.acc_dtype)
+        actions = np.asarray(actions)
+        rewards = np.asarray(rewards, dtype=self.acc_dtype)
+
+        for action in np.unique(actions):
+            if action < 0 or action >= self.n_actions:
+                continue
+            mask = actions == action
+            C = X[mask]
+            self.A[action] += C.T @ C
+            self.b[action] += rewards[mask] @ C
+
+            k = C.shape[0]
+            if self._updates_since_refresh[action] + k >= self.feature_dim:
+                self._refresh_arm(action)
+                self._updates_since_refresh[action] = 0
+                continue
 
-        # Outer product of context
-        self.A[action] += np.outer(context, context)
-        self.b[action] += reward * context
+            # Woodbury: (A + C^T C)^-1 = A^-1 - U^T (I + U C^T)^-1 U, U = C A^-1
+            A_inv = self.A_inv[action]
+            U = (C @ A_inv).astype(np.float64)
+            S = np.eye(k) + U @ C.T.astype(np.float64)
+            A_inv -= U.T @ np.linalg.solve(S, U)
+            self.theta[action] = A_inv @ self.b[action]
+            self._updates_since_refresh[action] += k
@@ -1,8 +1,12 @@
 import logging
-from typing import Any, Dict, List, Optional, Protocol, Union
+import re
+from typing import Any, Dict, Optional, Protocol, Sequence, Union
 
 logger = logging.getLogger(__name__)
 
+# First number in an LLM judgement, e.g. "Score: 0.8"
+_NUMBER_RE = re.compile(r"[-+]?\d*\.\d+|\d+")
+
 
 class RewardScorer(Protocol):
     """
@@ -26,11 +30,15 @@ class ErrorScorer:
 
     def __init__(
         self,
-        error_keys: List[str] = ["error", "exception"],
+        error_keys: Sequence[str] = ("error", "exception"),
         penalty: float = -1.0,
         success_reward: float = 1.0,
     ):
-        self.error_keys = error_keys
+        # Frozen so the keys can't be mutated (or aliased) after construction;
+        # a bare string is one key, not a sequence of single characters
+        self.error_keys = (
+            (error_keys,) if isinstance(error_keys, str) else tuple(error_keys)
+        )
         self.penalty = penalty
         self.success_reward = success_reward
 
@@ -42,6 +50,7 @@ class ErrorScorer:
             for key in self.error_keys:
                 if result.get(key):
                     return self.penalty
+            return self.success_reward
         # If result is an Exception object itself (unlikely in pure state dicts but possible in frameworks)
         if isinstance(result, Exception):
             return self.penalty
@@ -83,9 +92,7 @@ class LLMScorer:
                 text = str(self.llm(formatted_prompt))
 
             # Naive parsing: find the first number
-            import re
-
-            match = re.search(r"[-+]?\d*\.\d+|\d+", text)
+            match = _NUMBER_RE.search(text)
             if match:
                 return float(match.group())
             return 0.0
@@ -0,0 +1,137 @@
+import importlib.util
+import sys
+import unittest
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+
+from adaptivegraph import LearnableEdge
+from adaptivegraph.policy import LinUCBPolicy
+
+
+class TestBatchRouting(unittest.TestCase):
+    def test_select_action_batch_matches_single(self):
+        """Batched scoring picks the same arm as per-context scoring."""
+        rng = np.random.default_rng(0)
+        policy = LinUCBPolicy(n_actions=3, feature_dim=8, alpha=0.5)
+        for _ in range(100):
+            x = rng.standard_normal(8)
+            a = int(rng.integers(3))
+            policy.update(x, a, float(x[a] > 0))
+
+        contexts = rng.standard_normal((16, 8))
+        batch = policy.select_action_batch(contexts)
+        single = [policy.select_action(x) for x in contexts]
+        self.assertEqual(batch.tolist(), single)
+
+    def test_batch_call_tracks_ids(self):
+        edge = LearnableEdge(options=["A", "B"], feature_dim=4)
+        states = [
+            {"value": "s1", "event_id": "e1"},
+            {"value": "s2", "trace_id": "t1"},
+            {"value": "s3", "trace_id": "t1"},
+        ]
+
+        routes = edge.batch_call(states)
+
+        self.assertEqual(len(routes), 3)
+        self.assertTrue(all(r in ("A", "B") for r in routes))
+        self.assertIn("e1", edge.pending_decisions)
+        self.assertEqual(len(edge.active_traces["t1"]), 2)
+
+        edge.record_feedback(result={}, reward=1.0, event_id="e1")
+        edge.complete_trace("t1", final_reward=1.0)
+        self.assertEqual(len(edge.memory.get_all()["actions"]), 3)
+
+    def test_track_ids_disabled(self):
+        edge = LearnableEdge(options=["A", "B"], feature_dim=4, track_ids=False)
+        edge.batch_call([{"value": "s1", "event_id": "e1", "trace_id": "t1"}])
+        self.assertEqual(edge.pending_decisions, {})
+        self.assertEqual(edge.active_traces, {})
+
+    def test_custom_id_key(self):
+        edge = LearnableEdge(options=["A", "B"], feature_dim=4, id_key="request_id")
+        edge.batch_call([{"value": "s1", "request_id": "r1", "event_id": "e1"}])
+        self.assertEqual(list(edge.pending_decisions), ["r1"])
+
+    def test_encode_batch_embeds_duplicates_once(self):
+        calls = []
+
+        class Embedding:
+            def __call__(self, text):
+                return self.encode_batch([text])[0]
+
+            def encode_batch(self, texts):
+                calls.append(list(texts))
+                return np.array([[len(t), 1.0] for t in texts])
+
+        edge = LearnableEdge(
+            options=["A", "B"], feature_dim=2, embedding_fn=Embedding()
+        )
+        out = edge.encoder.encode_batch(["aa", "b", "aa", "b"])
+
+        self.assertEqual(calls, [["aa", "b"]])
+        np.testing.assert_allclose(out[0], out[2])
+        np.testing.assert_allclose(out[1], out[3])
+        self.assertEqual(len(edge.batch_call(["aa", "b", "aa"])), 3)
+
+    def test_batch_call_empty(self):
+        edge = LearnableEdge(options=["A", "B"], feature_dim=4)
+        self.assertEqual(edge.batch_call([]), [])
+
+
+class TestSentenceTransformerBatch(unittest.TestCase):
+    @patch.dict(sys.modules, {"sentence_transformers": MagicMock()})
+    def test_encode_batch_restores_input_order(self):
+        from adaptivegraph.embedding import SentenceTransformerEmbedding
+
+        embedding = SentenceTransformerEmbedding(dim=4)
+        seen = []
+
+        def fake_encode(texts, **kwargs):
+            seen.extend(texts)
+            return np.array([[len(t), 0.0, 0.0, 0.0, 0.0] for t in texts])
+
+        embedding.model.encode = fake_encode
+
+        out = embedding.encode_batch(["ccc", "a", "bb"])
+
+        self.assertEqual(seen, ["a", "bb", "ccc"])
+        self.assertEqual(out.shape, (3, 4))
+        self.assertEqual(out[:, 0].tolist(), [3.0, 1.0, 2.0])
+
+    def test_prompted_model_uses_encode(self):
+        with patch.dict(sys.modules, {"sentence_transformers": MagicMock()}):
+            from adaptivegraph.embedding import SentenceTransformerEmbedding
+
+            embedding = SentenceTransformerEmbedding(dim=4)
+        embedding.model.default_prompt_name = "query"
+        embedding.model.truncate_dim = None
+        embedding.model.encode.return_value = np.array([0.6, 0.8])
+
+        np.testing.assert_allclose(embedding("hello"), [0.6, 0.8, 0.0, 0.0])
+        embedding.model.eval.assert_called_once_with()
+        embedding.model.tokenize.assert_not_called()
+
+
+@unittest.skipUnless(
+    importlib.util.find_spec("sentence_transformers"),
+    "sentence-transformers not installed",
+)
+class TestSentenceTransformerForward(unittest.TestCase):
+    def test_forward_matches_encode(self):
+        """The direct single-text path returns encode()'s embedding."""
+        from adaptivegraph.embedding import SentenceTransformerEmbedding
+
+        try:
+            embedding = SentenceTransformerEmbedding(dim=384)
+        except OSError as e:  # model not cached and no network
+            self.skipTest(f"model unavailable: {e}")
+
+        for text in ("hello", "How do I reset my password?"):
+            expected = embedding.model.encode(text, normalize_embeddings=True)
+            np.testing.assert_allclose(embedding._forward(text), expected, atol=1e-5)
+
+
+if __name__ == "__main__":
+    unittest.main()
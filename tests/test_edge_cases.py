@@ -3,6 +3,7 @@ import shutil
 import sys
 import tempfile
 import unittest
+import warnings
 
 import numpy as np
 
@@ -36,7 +37,7 @@ class TestPolicyPersistence(unittest.TestCase):
         edge1.save_policy(self.policy_path)
 
         # Verify file exists
-        self.assertTrue(os.path.exists(f"{self.policy_path}.pkl"))
+        self.assertTrue(os.path.exists(f"{self.policy_path}.npz"))
 
         # 2. Create new edge and load policy
         edge2 = LearnableEdge(options=["A", "B"], feature_dim=4, exploration_alpha=0.5)
@@ -48,6 +49,50 @@ class TestPolicyPersistence(unittest.TestCase):
         np.testing.assert_array_almost_equal(edge1.policy.b, edge2.policy.b)
         self.assertEqual(edge1.policy.alpha, edge2.policy.alpha)
 
+        # Cached factors must follow the loaded matrices
+        np.testing.assert_array_almost_equal(edge1.policy.theta, edge2.policy.theta)
+
+    def test_load_legacy_pickle(self):
+        """Test that policies saved as .pkl by older versions still load."""
+        import pickle
+
+        edge1 = LearnableEdge(options=["A", "B"], feature_dim=4, exploration_alpha=0.5)
+        edge1("test")
+        edge1.record_feedback(result={}, reward=1.0)
+        with open(f"{self.policy_path}.pkl", "wb") as f:
+            pickle.dump(
+                {
+                    "A": edge1.policy.A,
+                    "b": edge1.policy.b,
+                    "n_actions": 2,
+                    "feature_dim": 4,
+                    "alpha": 0.5,
+                },
+                f,
+            )
+
+        edge2 = LearnableEdge(options=["A", "B"], feature_dim=4)
+        edge2.load_policy(self.policy_path)
+        np.testing.assert_array_equal(edge1.policy.A, edge2.policy.A)
+        self.assertEqual(edge2.policy.alpha, 0.5)
+
+    def test_load_policy_with_other_encoding_warns(self):
+        """Test that loading a policy trained on another encoding warns."""
+        edge1 = LearnableEdge(options=["A", "B"], feature_dim=4)
+        edge1.save_policy(self.policy_path)
+
+        same = LearnableEdge(options=["A", "B"], feature_dim=4)
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            same.load_policy(self.policy_path)
+
+        other = LearnableEdge(
+            options=["A", "B"], feature_dim=4, embedding_fn=lambda text: np.ones(4)
+        )
+        with self.assertWarns(UserWarning) as context:
+            other.load_policy(self.policy_path)
+        self.assertIn("retrain", str(context.warning))
+
     def test_load_nonexistent_policy(self):
         """Test that loading a nonexistent policy raises FileNotFoundError."""
         edge = LearnableEdge(options=["A", "B"], feature_dim=4)
@@ -120,6 +165,41 @@ class TestInputValidation(unittest.TestCase):
 
         self.assertIn("non-negative", str(context.exception))
 
+    def test_non_float_dtype(self):
+        """Test that an integer storage dtype raises ValueError."""
+        with self.assertRaises(ValueError) as context:
+            LearnableEdge(options=["A", "B"], dtype=np.int32)
+
+        self.assertIn("floating", str(context.exception))
+
+    def test_unknown_hash_algorithm(self):
+        """Test that an unknown fallback hash raises ValueError."""
+        with self.assertRaises(ValueError) as context:
+            LearnableEdge(options=["A", "B"], hash_algorithm="md5")
+
+        self.assertIn("shake256", str(context.exception))
+
+    def test_xxh3_requires_xxhash(self):
+        """Test that hash_algorithm='xxh3' without xxhash raises ImportError."""
+        from unittest.mock import patch
+
+        with patch.dict(sys.modules, {"xxhash": None}):
+            with self.assertRaises(ImportError):
+                LearnableEdge(options=["A", "B"], hash_algorithm="xxh3")
+
+    def test_half_precision_dtype(self):
+        """Test that float16 storage is honored end to end."""
+        edge = LearnableEdge(options=["A", "B"], feature_dim=4, dtype=np.float16)
+        edge("test")
+        edge.record_feedback(result={}, reward=1.0)
+
+        self.assertEqual(edge.policy.A_inv.dtype, np.float16)
+        self.assertEqual(edge.policy.theta.dtype, np.float16)
+        self.assertEqual(edge.encoder.encode("test").dtype, np.float16)
+        # Accumulators keep float32 headroom
+        self.assertEqual(edge.policy.A.dtype, np.float32)
+        self.assertEqual(edge.policy.b.dtype, np.float32)
+
 
 class TestRewardValidation(unittest.TestCase):
     def test_nan_reward(self):
@@ -178,8 +258,9 @@ class TestEdgeCases(unittest.TestCase):
         """Test that feedback without prior call is handled gracefully."""
         edge = LearnableEdge(options=["A", "B"], feature_dim=4)
 
-        # This should not crash, just do nothing
-        edge.record_feedback(result={}, reward=1.0)
+        # This should not crash, just warn and do nothing
+        with self.assertWarns(UserWarning):
+            edge.record_feedback(result={}, reward=1.0)
 
         # Memory should be empty
         mem = edge.memory.get_all()
@@ -192,12 +273,89 @@ class TestEdgeCases(unittest.TestCase):
 
         edge.record_feedback(result={}, reward=1.0)
         # Second feedback should do nothing (state cleared)
-        edge.record_feedback(result={}, reward=0.5)
+        with self.assertWarns(UserWarning):
+            edge.record_feedback(result={}, reward=0.5)
 
         # Should have only one entry
         mem = edge.memory.get_all()
         self.assertEqual(len(mem["actions"]), 1)
 
+    def test_fused_route_matches_encode_and_select(self):
+        """Test that the buffered routing path agrees with encode + select_action."""
+        edge = LearnableEdge(options=["A", "B", "C"], feature_dim=8)
+        for i in range(30):
+            edge(f"state {i % 5}")
+            edge.record_feedback(result={}, reward=float(i % 3))
+
+        for i in range(5):
+            context, action = edge._fused_route(f"state {i}")
+            np.testing.assert_array_equal(context, edge.encoder.encode(f"state {i}"))
+            self.assertEqual(action, edge.policy.select_action(context))
+
+    def test_encoder_cache(self):
+        """Test that repeated strings hit the cache and come back read-only."""
+        calls = []
+
+        def embed(text):
+            calls.append(text)
+            return np.ones(4)
+
+        edge = LearnableEdge(options=["A", "B"], feature_dim=4, embedding_fn=embed)
+        vec = edge.encoder.encode("hello")
+        edge("hello")
+        edge("hello")
+
+        self.assertEqual(calls, ["hello"])
+        self.assertFalse(vec.flags.writeable)
+
+        edge.cache_clear()
+        edge("hello")
+        self.assertEqual(len(calls), 2)
+
+    def test_hashed_vectors_are_copies(self):
+        """Test that mutating a hashed encoding does not corrupt later ones."""
+        edge = LearnableEdge(options=["A", "B"], feature_dim=4)
+        vec = edge.encoder.encode({"q": 1})
+        expected = vec.copy()
+        vec *= 0
+
+        np.testing.assert_array_equal(edge.encoder.encode({"q": 1}), expected)
+
+    def test_matching_array_passes_through(self):
+        """Test that a ready-made context vector is returned without a copy."""
+        edge = LearnableEdge(options=["A", "B"], feature_dim=4)
+        vec = np.ones(4, dtype=np.float32)
+        self.assertIs(edge.encoder.encode(vec), vec)
+
+        wide = np.ones(4, dtype=np.float64)
+        self.assertEqual(edge.encoder.encode(wide).dtype, np.float32)
+
+    def test_encoder_reconfiguration(self):
+        """Test that changing embedding_fn or normalize takes effect immediately."""
+        edge = LearnableEdge(options=["A", "B"], feature_dim=4)
+        edge.encoder.encode("hello")
+
+        edge.encoder.embedding_fn = lambda text: [3.0, 4.0]
+        np.testing.assert_allclose(edge.encoder.encode("hello"), [0.6, 0.8, 0, 0])
+
+        edge.encoder.normalize = False
+        np.testing.assert_allclose(edge.encoder.encode("hello"), [3.0, 4.0, 0, 0])
+
+    def test_value_key_extraction(self):
+        """Test that value_key reads dict keys and attributes, else passes through."""
+        edge = LearnableEdge(options=["A", "B"], feature_dim=4, value_key="query")
+
+        class State:
+            query = "hello"
+
+        self.assertEqual(edge._extract({"query": "hello"}), "hello")
+        self.assertEqual(edge._extract(State()), "hello")
+        self.assertEqual(edge._extract("raw"), "raw")
+
+        edge.value_key = None
+        state = {"query": "hello"}
+        self.assertIs(edge._extract(state), state)
+
     def test_complete_trace_nonexistent(self):
         """Test completing a trace that doesn't exist."""
         edge = LearnableEdge(options=["A", "B"], feature_dim=4)
@@ -210,5 +368,65 @@ class TestEdgeCases(unittest.TestCase):
         self.assertEqual(len(mem["actions"]), 0)
 
 
+class TestInMemoryStore(unittest.TestCase):
+    def test_growth_and_views(self):
+        """Test that the store grows past its initial capacity and returns views."""
+        from adaptivegraph.memory import InMemoryExperienceStore
+
+        store = InMemoryExperienceStore()
+        rng = np.random.default_rng(0)
+        vectors = rng.standard_normal((100, 3)).astype(np.float32)
+        for i, vec in enumerate(vectors):
+            store.add(vec, action=i % 2, reward=float(i))
+
+        data = store.get_all()
+        self.assertEqual(store.dim, 3)
+        self.assertEqual(store.total_decisions, 100)
+        np.testing.assert_array_equal(data["contexts"], vectors)
+        self.assertEqual(data["actions"].tolist(), [i % 2 for i in range(100)])
+        self.assertAlmostEqual(store.get_statistics()["average_reward"], 49.5)
+
+        store.clear()
+        self.assertEqual(len(store.get_all()["actions"]), 0)
+
+    def test_add_batch_matches_add(self):
+        """Test that a bulk append stores the same rows as per-row adds."""
+        from adaptivegraph.memory import InMemoryExperienceStore
+
+        rng = np.random.default_rng(2)
+        vectors = rng.standard_normal((150, 4)).astype(np.float32)
+        for quantize in (False, True):
+            single = InMemoryExperienceStore(quantize=quantize)
+            for i, vec in enumerate(vectors):
+                single.add(vec, action=i % 3, reward=float(i))
+            bulk = InMemoryExperienceStore(quantize=quantize)
+            bulk.add_batch(vectors[:10], np.arange(10) % 3, np.arange(10.0))
+            bulk.add_batch(vectors[10:], np.arange(10, 150) % 3, np.arange(10.0, 150))
+
+            for key in ("contexts", "actions", "rewards"):
+                np.testing.assert_array_equal(
+                    bulk.get_all()[key], single.get_all()[key]
+                )
+            self.assertEqual(len(bulk.metadata), 150)
+
+    def test_quantized_contexts(self):
+        """Test that int8 storage round-trips unit vectors closely."""
+        from adaptivegraph.memory import InMemoryExperienceStore
+
+        store = InMemoryExperienceStore(quantize=True)
+        rng = np.random.default_rng(1)
+        vectors = rng.standard_normal((100, 16)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        for vec in vectors:
+            store.add(vec, action=0, reward=1.0)
+        store.add(np.zeros(16), action=1, reward=0.0)
+
+        contexts = store.get_all()["contexts"]
+        self.assertEqual(store._contexts.dtype, np.int8)
+        self.assertEqual(contexts.dtype, np.float32)
+        np.testing.assert_allclose(contexts[:100], vectors, atol=0.01)
+        np.testing.assert_array_equal(contexts[100], np.zeros(16))
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -1,8 +1,11 @@
 import os
 import sys
+import tempfile
 import unittest
 from unittest.mock import MagicMock, patch
 
+import numpy as np
+
 # Ensure src is in path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../src")))
 
@@ -49,6 +52,92 @@ class TestLearnableEdgeFactory(unittest.TestCase):
             )
             self.assertIsInstance(edge.memory, InMemoryExperienceStore)
 
+    def test_create_static_embedding(self):
+        """Test static word-vector embedding is wired through create()."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "vectors.vec")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("3 4\n")
+                f.write("vip 1 0 0 0\n")
+                f.write("guest 0 1 0 0\n")
+                f.write("request 0 0 1 0\n")
+
+            edge = LearnableEdge.create(
+                options=["A", "B"],
+                embedding="static",
+                embedding_path=path,
+                memory="memory",
+                feature_dim=4,
+            )
+
+        vec = edge.encoder.encode("VIP request!")
+        np.testing.assert_allclose(vec, [2**-0.5, 0, 2**-0.5, 0], atol=1e-6)
+        self.assertIn(edge("guest request"), ["A", "B"])
+
+    def test_static_embedding_cased_lookup_and_cache(self):
+        """Cased entries win over lowercase ones; later loads memory-map a cache."""
+        from adaptivegraph.embedding import StaticEmbedding
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "vectors.vec")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("Paris 1 0\n")
+                f.write("paris 0 1\n")
+
+            first = StaticEmbedding(path, dim=2)
+            self.assertTrue(os.path.exists(path + ".npy"))
+            np.testing.assert_allclose(first("Paris"), [1, 0])
+            np.testing.assert_allclose(first("paris"), [0, 1])
+            np.testing.assert_allclose(first("PARIS"), [0, 1])
+
+            second = StaticEmbedding(path, dim=2)
+            self.assertIsInstance(second.table, np.memmap)
+            self.assertEqual(second.vocab, first.vocab)
+            np.testing.assert_allclose(second("Paris"), [1, 0])
+            del second
+
+    def test_create_static_requires_path(self):
+        with self.assertRaises(ValueError):
+            LearnableEdge.create(
+                options=["A", "B"], embedding="static", memory="memory"
+            )
+
+    @patch.dict(
+        sys.modules,
+        {
+            "optimum": MagicMock(),
+            "optimum.onnxruntime": MagicMock(),
+            "transformers": MagicMock(),
+        },
+    )
+    def test_create_onnx_embedding(self):
+        """Test ONNX embedding is wired through create() and mean-pools outputs."""
+        from adaptivegraph.embedding import OnnxSentenceEmbedding
+
+        self.addCleanup(OnnxSentenceEmbedding._sessions.clear)
+        edge = LearnableEdge.create(
+            options=["A", "B"],
+            embedding="sentence-transformers-onnx",
+            memory="memory",
+            feature_dim=2,
+        )
+        embedding = edge.encoder.embedding_fn
+        self.assertIsInstance(embedding, OnnxSentenceEmbedding)
+
+        # Two tokens, the second one is padding and must be ignored
+        embedding.tokenizer = MagicMock(
+            return_value={
+                "input_ids": np.array([[1, 0]]),
+                "attention_mask": np.array([[1, 0]]),
+            }
+        )
+        input_ids = MagicMock()
+        input_ids.name = "input_ids"
+        embedding.session.get_inputs.return_value = [input_ids]
+        embedding.session.run.return_value = [np.array([[[3.0, 4.0, 0.0], [9, 9, 9]]])]
+
+        np.testing.assert_allclose(embedding("hi"), [0.6, 0.8], atol=1e-6)
+
 
 if __name__ == "__main__":
     unittest.main()
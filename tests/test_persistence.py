@@ -1,6 +1,7 @@
 import os
 import shutil
 import sys
+import tempfile
 import unittest
 
 import numpy as np
@@ -13,10 +14,8 @@ from adaptivegraph.memory import FaissExperienceStore  # noqa: E402
 
 class TestFaissPersistence(unittest.TestCase):
     def setUp(self):
-        self.test_dir = "./test_persist_data"
-        if os.path.exists(self.test_dir):
-            shutil.rmtree(self.test_dir)
-        os.makedirs(self.test_dir)
+        # A private directory per test, so parallel workers never collide
+        self.test_dir = tempfile.mkdtemp()
         self.persist_path = os.path.join(self.test_dir, "test_store")
 
     def tearDown(self):
@@ -40,6 +39,27 @@ class TestFaissPersistence(unittest.TestCase):
         self.assertEqual(len(data["actions"]), 1)
         self.assertEqual(data["actions"][0], 1)
         self.assertEqual(data["metadata"][0]["k"], "v")
+        np.testing.assert_allclose(data["contexts"], [vec1])
+
+    def test_adds_are_logged_between_checkpoints(self):
+        store1 = FaissExperienceStore(
+            dim=4, persist_path=self.persist_path, checkpoint_every=100
+        )
+        vectors = np.eye(4, dtype=np.float32)
+        for i, vec in enumerate(vectors):
+            store1.add(vec, action=i, reward=0.5 * i, metadata={"i": i})
+        self.assertTrue(os.path.exists(self.persist_path + ".log"))
+
+        # The checkpoint holds the first add; the rest replay from the log
+        store2 = FaissExperienceStore(dim=4, persist_path=self.persist_path)
+        data = store2.get_all()
+        self.assertEqual(data["actions"].tolist(), [0, 1, 2, 3])
+        self.assertEqual(data["rewards"].tolist(), [0.0, 0.5, 1.0, 1.5])
+        self.assertEqual(data["metadata"][3], {"i": 3})
+        np.testing.assert_allclose(data["contexts"], vectors)
+
+        store1.save()
+        self.assertEqual(os.path.getsize(self.persist_path + ".log"), 0)
 
     def test_clear_deletes_Files(self):
         store = FaissExperienceStore(dim=4, persist_path=self.persist_path)
@@ -50,6 +70,125 @@ class TestFaissPersistence(unittest.TestCase):
         self.assertFalse(os.path.exists(self.persist_path + ".index"))
         self.assertFalse(os.path.exists(self.persist_path + ".pkl"))
 
+    def test_on_disk_contexts(self):
+        rng = np.random.default_rng(0)
+        vectors = rng.standard_normal((1500, 4)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+        store1 = FaissExperienceStore(
+            dim=4, persist_path=self.persist_path, auto_save=False, on_disk=True
+        )
+        for i, vec in enumerate(vectors):
+            store1.add(vec, action=i % 2, reward=1.0)
+        store1.save()
+        self.assertTrue(os.path.exists(self.persist_path + ".ctx"))
+
+        store2 = FaissExperienceStore(
+            dim=4, persist_path=self.persist_path, on_disk=True
+        )
+        data = store2.get_all()
+        self.assertEqual(store2.total_decisions, 1500)
+        np.testing.assert_allclose(data["contexts"], vectors, atol=1e-6)
+
+    def test_on_disk_requires_path(self):
+        with self.assertRaises(ValueError):
+            FaissExperienceStore(dim=4, on_disk=True)
+
+
+class TestFaissIndexTypes(unittest.TestCase):
+    def test_query_similar_finds_self(self):
+        rng = np.random.default_rng(0)
+        vectors = rng.standard_normal((200, 8))
+
+        for index_type in ("hnsw", "flat"):
+            store = FaissExperienceStore(dim=8, index_type=index_type)
+            for i, vec in enumerate(vectors):
+                store.add(vec, action=i % 2, reward=1.0)
+
+            result = store.query_similar(vectors[42], k=3)
+            self.assertEqual(result["indices"][0], 42, index_type)
+            self.assertAlmostEqual(float(result["scores"][0]), 1.0, places=5)
+
+    def test_add_batch(self):
+        rng = np.random.default_rng(2)
+        vectors = rng.standard_normal((10, 4)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        store = FaissExperienceStore(dim=4, index_type="flat", buffer_size=4)
+        store.add(vectors[0], action=0, reward=0.0)
+        store.add_batch(vectors[1:], np.arange(1, 10), np.arange(1.0, 10))
+
+        data = store.get_all()
+        self.assertEqual(store.total_decisions, 10)
+        self.assertEqual(data["actions"].tolist(), list(range(10)))
+        np.testing.assert_allclose(data["contexts"], vectors, atol=1e-6)
+
+    def test_query_similar_batch(self):
+        rng = np.random.default_rng(1)
+        vectors = rng.standard_normal((100, 8))
+        store = FaissExperienceStore(dim=8, index_type="flat")
+        for vec in vectors:
+            store.add(vec, action=0, reward=1.0)
+
+        result = store.query_similar_batch(vectors[[3, 50, 99]], k=2)
+        self.assertEqual(result["indices"].shape, (3, 2))
+        self.assertEqual(result["indices"][:, 0].tolist(), [3, 50, 99])
+        np.testing.assert_allclose(result["scores"][:, 0], 1.0, rtol=1e-5)
+
+    def test_adds_are_buffered(self):
+        store = FaissExperienceStore(dim=4, index_type="flat", buffer_size=4)
+        for i in range(10):
+            store.add(np.eye(4)[i % 4], action=0, reward=1.0)
+
+        self.assertEqual(store.index.ntotal, 8)
+        result = store.query_similar(np.eye(4)[1], k=1)
+        self.assertEqual(store.index.ntotal, 10)
+        self.assertIn(result["indices"][0], (1, 5, 9))
+
+    def test_get_all_reconstructs_from_index(self):
+        store = FaissExperienceStore(dim=4, index_type="flat")
+        vectors = np.eye(4, dtype=np.float32)
+        for vec in vectors[:2]:
+            store.add(vec, action=0, reward=1.0)
+        np.testing.assert_array_equal(store.get_all()["contexts"], vectors[:2])
+
+        for vec in vectors[2:]:
+            store.add(vec, action=1, reward=0.0)
+        np.testing.assert_array_equal(store.get_all()["contexts"], vectors)
+
+    def test_ef_search(self):
+        store = FaissExperienceStore(dim=8, ef_search=128)
+        self.assertEqual(store.index.hnsw.efSearch, 128)
+
+        vectors = np.random.default_rng(0).standard_normal((50, 8))
+        for vec in vectors:
+            store.add(vec, action=0, reward=1.0)
+        result = store.query_similar(vectors[7], k=1, ef_search=16)
+        self.assertEqual(result["indices"][0], 7)
+        self.assertEqual(store.index.hnsw.efSearch, 128)
+
+    def test_n_threads(self):
+        import faiss
+
+        before = faiss.omp_get_max_threads()
+        try:
+            FaissExperienceStore(dim=8, n_threads=1)
+            self.assertEqual(faiss.omp_get_max_threads(), 1)
+        finally:
+            faiss.omp_set_num_threads(before)
+
+    def test_unknown_index_type(self):
+        with self.assertRaises(ValueError):
+            FaissExperienceStore(dim=8, index_type="ivf")
+
+    def test_device_validation(self):
+        with self.assertRaises(ValueError):
+            FaissExperienceStore(dim=8, device="tpu")
+        with self.assertRaises(ValueError):
+            FaissExperienceStore(dim=8, index_type="hnsw", device="cuda")
+
+        store = FaissExperienceStore(dim=8, index_type="flat", device="cpu")
+        self.assertEqual(store.device, "cpu")
+
 
 if __name__ == "__main__":
     unittest.main()
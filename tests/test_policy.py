@@ -0,0 +1,143 @@
+import importlib.util
+import unittest
+
+import numpy as np
+
+from adaptivegraph.policy import LinUCBPolicy
+
+
+class TestLinUCBCache(unittest.TestCase):
+    def test_cached_factors_track_updates(self):
+        """Incremental A^-1 / theta updates stay equal to a fresh solve."""
+        rng = np.random.default_rng(0)
+        policy = LinUCBPolicy(n_actions=3, feature_dim=8, dtype=np.float64)
+
+        for _ in range(200):
+            x = rng.standard_normal(8)
+            policy.update(x / np.linalg.norm(x), int(rng.integers(3)), rng.random())
+
+        for a in range(3):
+            np.testing.assert_allclose(
+                policy.A_inv[a], np.linalg.inv(policy.A[a]), atol=1e-10
+            )
+            np.testing.assert_allclose(
+                policy.theta[a], np.linalg.solve(policy.A[a], policy.b[a]), atol=1e-10
+            )
+
+    def test_half_precision_keeps_accumulating(self):
+        """float16 policies keep counting past float16's 2048 integer limit."""
+        policy = LinUCBPolicy(n_actions=2, feature_dim=4, dtype=np.float16)
+        x = np.array([1.0, 0.0, 0.0, 0.0])
+        for _ in range(5000):
+            policy.update(x, 0, 1.0)
+        policy.update_batch(
+            np.tile(x, (100, 1)), np.zeros(100, dtype=int), np.ones(100)
+        )
+
+        self.assertEqual(policy.A[0, 0, 0], 5101.0)
+        self.assertEqual(policy.b[0, 0], 5100.0)
+        self.assertEqual(policy.A_inv.dtype, np.float16)
+        np.testing.assert_allclose(policy.theta[0, 0], 5100 / 5101, rtol=1e-3)
+
+    def test_seeded_tie_breaking_is_reproducible(self):
+        """Both selection paths draw ties from the policy's seeded generator."""
+        x = np.ones(4) / 2.0  # every arm scores the same on a fresh policy
+        runs = []
+        for _ in range(2):
+            policy = LinUCBPolicy(n_actions=4, feature_dim=4, seed=7)
+            singles = [policy.select_action(x) for _ in range(20)]
+            batch = policy.select_action_batch(np.tile(x, (20, 1))).tolist()
+            runs.append((singles, batch))
+
+        self.assertEqual(runs[0], runs[1])
+        self.assertGreater(len(set(runs[0][0])), 1)
+        self.assertGreater(len(set(runs[0][1])), 1)
+
+    def test_update_batch_matches_sequential(self):
+        """One batched update leaves the same state as per-row updates."""
+        rng = np.random.default_rng(2)
+        X = rng.standard_normal((40, 6))
+        actions = rng.integers(3, size=40)
+        rewards = rng.random(40)
+
+        seq = LinUCBPolicy(n_actions=3, feature_dim=6, dtype=np.float64)
+        for x, a, r in zip(X, actions, rewards):
+            seq.update(x, int(a), r)
+        batch = LinUCBPolicy(n_actions=3, feature_dim=6, dtype=np.float64)
+        batch.update_batch(X, actions, rewards)
+
+        np.testing.assert_allclose(batch.A, seq.A)
+        np.testing.assert_allclose(batch.b, seq.b)
+        np.testing.assert_allclose(batch.theta, seq.theta, atol=1e-10)
+
+    def test_short_update_batch_uses_low_rank_step(self):
+        """A batch smaller than feature_dim updates A^-1 without refactoring."""
+        rng = np.random.default_rng(4)
+        policy = LinUCBPolicy(n_actions=2, feature_dim=16, dtype=np.float64)
+        policy.update_batch(
+            rng.standard_normal((6, 16)), [0, 1, 0, 0, 1, 0], rng.random(6)
+        )
+
+        self.assertEqual(policy._updates_since_refresh.tolist(), [4, 2])
+        for a in range(2):
+            np.testing.assert_allclose(
+                policy.A_inv[a], np.linalg.inv(policy.A[a]), atol=1e-10
+            )
+            np.testing.assert_allclose(
+                policy.theta[a], np.linalg.solve(policy.A[a], policy.b[a]), atol=1e-10
+            )
+
+    def test_single_arm_still_learns(self):
+        """With one arm selection is fixed, but updates still fit the model."""
+        policy = LinUCBPolicy(n_actions=1, feature_dim=4, dtype=np.float64)
+        x = np.array([1.0, 0.0, 0.0, 0.0])
+        policy.update(x, 0, 2.0)
+
+        self.assertEqual(policy.select_action(x), 0)
+        self.assertEqual(policy.select_action_batch(np.eye(4)).tolist(), [0] * 4)
+        self.assertAlmostEqual(policy.theta[0, 0], 1.0)
+
+
+@unittest.skipUnless(importlib.util.find_spec("numba"), "numba not installed")
+class TestNumbaKernel(unittest.TestCase):
+    def test_kernel_matches_numpy_scores(self):
+        rng = np.random.default_rng(1)
+        policy = LinUCBPolicy(n_actions=4, feature_dim=16, dtype=np.float64)
+        self.assertIsNotNone(policy._ucb_kernel)
+        for _ in range(50):
+            policy.update(rng.standard_normal(16), int(rng.integers(4)), rng.random())
+
+        x = rng.standard_normal(16)
+        out = np.empty(4)
+        policy._ucb_kernel(policy.A_inv, policy.theta, x, policy.alpha, out)
+        expected = policy.theta @ x + policy.alpha * np.sqrt(
+            np.einsum("kij,i,j->k", policy.A_inv, x, x)
+        )
+        np.testing.assert_allclose(out, expected, rtol=1e-9)
+
+    def test_fused_update_tracks_exact_inverse(self):
+        rng = np.random.default_rng(3)
+        policy = LinUCBPolicy(n_actions=2, feature_dim=64, dtype=np.float64)
+        self.assertIsNotNone(policy._update_kernel)
+        for _ in range(50):
+            x = rng.standard_normal(64)
+            policy.update(x / np.linalg.norm(x), int(rng.integers(2)), rng.random())
+
+        for a in range(2):
+            np.testing.assert_allclose(
+                policy.A_inv[a], np.linalg.inv(policy.A[a]), atol=1e-9
+            )
+
+    def test_box_muller_kernel_matches_numpy(self):
+        from unittest.mock import patch
+
+        from adaptivegraph import encoder
+
+        jit = encoder._hash_vector.__wrapped__("some state", 31, True)
+        with patch.object(encoder, "_numba_box_muller_kernel", lambda: None):
+            ref = encoder._hash_vector.__wrapped__("some state", 31, True)
+        np.testing.assert_allclose(jit, ref, atol=1e-12)
+
+
+if __name__ == "__main__":
+    unittest.main()
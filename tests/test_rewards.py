@@ -1,3 +1,4 @@
+import threading
 import unittest
 
 import numpy as np
@@ -7,9 +8,17 @@ from adaptivegraph.rewards import ErrorScorer
 
 
 class TestRewardsAndAsync(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Built once; each test starts from a reset copy of the same edge
+        cls.edge = LearnableEdge(options=["A", "B"], feature_dim=4)
+
+    def setUp(self):
+        self.edge.reset()
+
     def test_id_based_feedback(self):
         # 1. Setup Edge
-        edge = LearnableEdge(options=["A", "B"], feature_dim=4)
+        edge = self.edge
 
         # 2. Call with event_id
         state = {"value": "test", "event_id": "cust_123"}
@@ -29,6 +38,52 @@ class TestRewardsAndAsync(unittest.TestCase):
         self.assertEqual(len(mem["actions"]), 1)
         self.assertEqual(mem["rewards"][0], 1.0)
 
+    def test_pending_decisions_evict_oldest(self):
+        edge = LearnableEdge(options=["A", "B"], feature_dim=4, max_pending=2)
+        for event_id in ("e1", "e2", "e3"):
+            edge({"value": event_id, "event_id": event_id})
+
+        self.assertEqual(sorted(edge.pending_decisions), ["e2", "e3"])
+
+        edge.record_feedback(result={}, reward=1.0, event_id="e1")
+        edge.record_feedback(result={}, reward=1.0, event_id="e2")
+        mem = edge.memory.get_all()
+        self.assertEqual(len(mem["actions"]), 1)
+        np.testing.assert_allclose(
+            mem["contexts"][0], edge.encoder.encode({"value": "e2"})
+        )
+
+    def test_resolved_decisions_free_their_slots(self):
+        edge = LearnableEdge(options=["A", "B"], feature_dim=4, max_pending=3)
+        edge({"value": "slow", "event_id": "slow"})
+        for i in range(10):
+            event_id = f"fast{i}"
+            edge({"value": event_id, "event_id": event_id})
+            edge.record_feedback(result={}, reward=0.0, event_id=event_id)
+
+        self.assertEqual(list(edge.pending_decisions), ["slow"])
+
+        edge.record_feedback(result={}, reward=1.0, event_id="slow")
+        mem = edge.memory.get_all()
+        self.assertEqual(len(mem["actions"]), 11)
+        self.assertEqual(mem["rewards"][-1], 1.0)
+        np.testing.assert_allclose(
+            mem["contexts"][-1], edge.encoder.encode({"value": "slow"})
+        )
+
+    def test_ids_are_not_encoded(self):
+        edge = self.edge
+        edge({"value": "same", "event_id": "e1"})
+        edge({"value": "same", "event_id": "e2", "trace_id": "t1"})
+
+        slots = [edge.pending_decisions[e] for e in ("e1", "e2")]
+        np.testing.assert_array_equal(
+            edge._ctx_ring[slots[0]], edge._ctx_ring[slots[1]]
+        )
+        np.testing.assert_array_equal(
+            edge._ctx_ring[slots[0]], edge.encoder.encode({"value": "same"})
+        )
+
     def test_error_scorer(self):
         scorer = ErrorScorer(penalty=-5.0)
 
@@ -38,8 +93,14 @@ class TestRewardsAndAsync(unittest.TestCase):
         good_state = {"result": "ok"}
         self.assertEqual(scorer.score(good_state), 1.0)
 
+    def test_error_scorer_single_key_string(self):
+        scorer = ErrorScorer(error_keys="error", penalty=-5.0)
+        self.assertEqual(scorer.error_keys, ("error",))
+        self.assertEqual(scorer.score({"error": "boom"}), -5.0)
+        self.assertEqual(scorer.score({"e": "ok", "r": "ok"}), 1.0)
+
     def test_trajectory_reward(self):
-        edge = LearnableEdge(options=["A", "B"], feature_dim=4)
+        edge = self.edge
 
         # Step 1
         edge({"value": "s1", "trace_id": "t1"})
@@ -72,6 +133,62 @@ class TestRewardsAndAsync(unittest.TestCase):
         self.assertAlmostEqual(mem["rewards"][0], 1.0)
         self.assertAlmostEqual(mem["rewards"][1], 0.5)
 
+    def test_sequential_feedback_is_per_thread(self):
+        edge = self.edge
+        edge("main thread state")
+
+        # Another thread has no pending decision of its own
+        worker = threading.Thread(
+            target=edge.record_feedback, kwargs={"result": {}, "reward": 1.0}
+        )
+        with self.assertWarns(UserWarning):
+            worker.start()
+            worker.join()
+        self.assertEqual(len(edge.memory.get_all()["actions"]), 0)
+
+        edge.record_feedback(result={}, reward=1.0)
+        self.assertEqual(len(edge.memory.get_all()["actions"]), 1)
+
+    def test_sequential_feedback_is_per_edge(self):
+        other = LearnableEdge(options=["A", "B"], feature_dim=4)
+        self.edge("first edge state")
+        other("second edge state")
+
+        self.edge.record_feedback(result={}, reward=1.0)
+        other.record_feedback(result={}, reward=1.0)
+        self.assertEqual(self.edge.memory.total_decisions, 1)
+        self.assertEqual(other.memory.total_decisions, 1)
+
+    def test_reset_forgets_everything(self):
+        edge = self.edge
+        edge({"value": "s1", "event_id": "e1", "trace_id": "t1"})
+        edge.record_feedback(result={}, reward=1.0)
+        edge({"value": "s2", "event_id": "e2"})
+
+        edge.reset()
+        self.assertEqual(edge.pending_decisions, {})
+        self.assertEqual(edge.active_traces, {})
+        self.assertEqual(edge.memory.total_decisions, 0)
+        np.testing.assert_array_equal(edge.policy.b, 0)
+        np.testing.assert_allclose(edge.policy.A_inv[0], np.eye(4))
+
+    def test_reset_with_store_without_clear(self):
+        class AppendOnlyStore:
+            def __init__(self):
+                self.rows = []
+
+            def add(self, context, action, reward, metadata=None):
+                self.rows.append((context, action, reward))
+
+        store = AppendOnlyStore()
+        edge = LearnableEdge(options=["A", "B"], feature_dim=4, experience_store=store)
+        edge("s1")
+        edge.record_feedback(result={}, reward=1.0)
+
+        edge.reset()
+        self.assertEqual(len(store.rows), 1)
+        np.testing.assert_array_equal(edge.policy.b, 0)
+
 
 if __name__ == "__main__":
     unittest.main()